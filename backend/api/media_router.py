@@ -188,6 +188,7 @@ async def generate_media(
             style_prompt = voice_settings.get("style_prompt", None)  # Optional custom style
             speaking_rate = voice_settings.get("speaking_rate", 1.0)
             pitch = voice_settings.get("pitch", 0.0)
+            quality = voice_settings.get("quality", "fast")  # "high" selects Pro TTS
             
             result = await media_service.generate_voice(
                 text=request.prompt,
@@ -198,7 +199,8 @@ async def generate_media(
                 style_prompt=style_prompt,
                 speaking_rate=speaking_rate,
                 pitch=pitch,
-                suggested_name=request.suggested_name or ""
+                suggested_name=request.suggested_name or "",
+                quality=quality
             )
             
             return MediaGenerationResponse(
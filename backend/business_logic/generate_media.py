@@ -421,6 +421,7 @@ Generate logo: """
             
             # Download reference image if provided
             reference_image = None
+            reference_image_bytes = None
             if reference_image_url:
                 try:
                     logger.info(f"Downloading reference image: {reference_image_url[:80]}...")
@@ -428,6 +429,7 @@ Generate logo: """
                         response = await client.get(reference_image_url)
                     response.raise_for_status()
                     reference_image = Image.open(BytesIO(response.content))
+                    reference_image_bytes = response.content
                     logger.info(f"Reference image downloaded: {reference_image.size}")
                 except Exception as img_error:
                     logger.warning(f"Failed to download reference image: {img_error}")
@@ -440,6 +442,7 @@ Generate logo: """
                 aspect_ratio=aspect_ratio,
                 resolution=resolution,
                 reference_image=reference_image,
+                reference_image_bytes=reference_image_bytes,
                 user_id=user_id,
                 session_id=session_id
             )
@@ -534,14 +537,17 @@ Generate logo: """
             file_name = f"generated_video_{asset_id}.mp4"
             
             logger.info(f"Uploading video to storage: {unique_name}")
-            upload_result = await self.storage_provider.upload_file(
-                file_data=BytesIO(generated_video.video_data),
-                user_id=user_id,
-                session_id=session_id,
-                filename=file_name,
-                name=unique_name,
-                content_type="video/mp4"
-            )
+            try:
+                upload_result = await self.storage_provider.upload_file(
+                    file_data=generated_video.open_stream(),
+                    user_id=user_id,
+                    session_id=session_id,
+                    filename=file_name,
+                    name=unique_name,
+                    content_type="video/mp4"
+                )
+            finally:
+                generated_video.close()
             
             logger.info(f"✅ Video uploaded: {unique_name}")
             
@@ -584,10 +590,11 @@ Generate logo: """
         style_prompt: Optional[str] = None,
         speaking_rate: float = 1.0,
         pitch: float = 0.0,
-        suggested_name: str = ""
+        suggested_name: str = "",
+        quality: str = "fast"
     ) -> GeneratedAssetResult:
         """
-        Generate voice-over/speech from text script using Gemini 2.5 Pro TTS.
+        Generate voice-over/speech from text script using Gemini 2.5 TTS.
         
         Workflow:
         1. Generate audio via Gemini TTS with prompt-based style control
@@ -605,6 +612,7 @@ Generate logo: """
                           If None, uses natural conversational tone
             speaking_rate: Speech speed (0.25-4.0, default 1.0)
             pitch: Voice pitch (-20.0 to 20.0, default 0.0)
+            quality: "fast" (Flash TTS, default) or "high" (Pro TTS for nuanced style prompts)
             
         Returns:
             GeneratedAssetResult with audio URL, duration, and sentence timestamps
@@ -623,6 +631,7 @@ Generate logo: """
                 style_prompt=style_prompt,
                 speaking_rate=speaking_rate,
                 pitch=pitch,
+                quality=quality,
                 audio_encoding="MP3",
                 sample_rate_hertz=24000
             )
@@ -5,8 +5,10 @@ Provides factory functions for creating provider instances with proper
 configuration and dependency injection for FastAPI endpoints.
 """
 
+import asyncio
 import logging
 import os
+import time
 from functools import lru_cache
 from typing import Optional, Tuple
 
@@ -17,16 +19,10 @@ from services.base.MediaProvider import MediaProvider
 from services.base.ImageGenerationProvider import ImageGenerationProvider
 from services.base.VideoGenerationProvider import VideoGenerationProvider
 from services.base.VoiceGenerationProvider import VoiceGenerationProvider
-from services.google.GeminiMediaAnalysisProvider import GeminiMediaAnalysisProvider
 from services.google.GCStorageProvider import GCStorageProvider
-from services.google.GeminiChatProvider import GeminiChatProvider
-from services.google.Gemini3ChatProvider import Gemini3ChatProvider
-from services.anthropic.ClaudeChatProvider import ClaudeChatProvider
-from services.openai.OpenAIChatProvider import OpenAIChatProvider
 from services.pexels.PexelsMediaProvider import PexelsMediaProvider
-from services.google.ImagenGenerationProvider import ImagenGenerationProvider
-from services.google.VEOGenerationProvider import VEOGenerationProvider
 from services.google.GoogleTTSProvider import GoogleTTSProvider
+from utils.semantic_cache import SemanticCache
 
 
 logger = logging.getLogger(__name__)
@@ -49,6 +45,7 @@ def get_media_analysis_provider() -> MediaAnalysisProvider:
     provider_type = os.getenv("MEDIA_ANALYSIS_PROVIDER", "gemini")
     
     if provider_type == "gemini":
+        from services.google.GeminiMediaAnalysisProvider import GeminiMediaAnalysisProvider
         return GeminiMediaAnalysisProvider(
             project_id=os.getenv("GOOGLE_CLOUD_PROJECT"),
             location=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1"),
@@ -67,6 +64,8 @@ def get_storage_provider() -> StorageProvider:
     Uses @lru_cache() to ensure only one instance is created.
     
     Currently returns GCStorageProvider (Google Cloud Storage).
+    Construction makes no network calls: bucket existence and CORS are
+    verified by warm_up_providers, or else on the first blob operation.
     
     Returns:
         StorageProvider instance (GCStorageProvider)
@@ -77,19 +76,58 @@ def get_storage_provider() -> StorageProvider:
     )
 
 
+@lru_cache()
+def get_chat_response_cache() -> Optional[SemanticCache]:
+    """
+    Shared semantic response cache for chat providers.
+    
+    Opt-in via CHAT_RESPONSE_CACHE=true; returns None when disabled.
+    """
+    if not _chat_response_cache_enabled():
+        return None
+    
+    return SemanticCache(embed_fn=get_embedding_provider().embed_single)
+
+
+def _chat_response_cache_enabled() -> bool:
+    return os.getenv("CHAT_RESPONSE_CACHE", "").lower() == "true"
+
+
+@lru_cache()
+def get_embedding_provider():
+    """Singleton GeminiEmbeddingProvider shared by embedding consumers."""
+    from services.google.GeminiEmbeddingProvider import GeminiEmbeddingProvider
+    
+    return GeminiEmbeddingProvider(
+        project_id=os.getenv("GOOGLE_CLOUD_PROJECT"),
+        location=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
+    )
+
+
+@lru_cache(maxsize=16)
 def _build_chat_provider(provider_key: Optional[str], thinking_budget: int = 8000) -> ChatProvider:
-    """Instantiate a chat provider based on the normalized provider key."""
+    """Instantiate a chat provider based on the normalized provider key.
+    
+    Cached per (provider_key, thinking_budget) so per-request resolution
+    reuses clients (and their warm connections) instead of rebuilding them.
+    Provider modules are imported on first use, so SDKs for chat backends
+    that are never selected (anthropic, openai) are not imported at all.
+    """
     key = (provider_key or "gemini").strip().lower()
     
     if key == "gemini":
+        from services.google.GeminiChatProvider import GeminiChatProvider
         return GeminiChatProvider(
             project_id=os.getenv("GOOGLE_CLOUD_PROJECT"),
             location=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1"),
             default_model_name=os.getenv("CHAT_MODEL", "gemini-2.5-flash"),
             default_temperature=1.0,
-            default_thinking_budget=thinking_budget
+            default_thinking_budget=thinking_budget,
+            response_cache=get_chat_response_cache(),
+            native_multi_turn=os.getenv("GEMINI_NATIVE_MULTI_TURN", "").lower() == "true"
         )
     elif key in {"gemini-3", "gemini-3-low", "gemini-3-high"}:
+        from services.google.Gemini3ChatProvider import Gemini3ChatProvider
         level = "high" if key.endswith("high") else "low"
         return Gemini3ChatProvider(
             project_id=os.getenv("GOOGLE_CLOUD_PROJECT"),
@@ -99,12 +137,14 @@ def _build_chat_provider(provider_key: Optional[str], thinking_budget: int = 800
             default_thinking_level=level
         )
     elif key == "claude":
+        from services.anthropic.ClaudeChatProvider import ClaudeChatProvider
         return ClaudeChatProvider(
             default_model_name=os.getenv("CLAUDE_MODEL", "claude-sonnet-4-5"),
             default_temperature=1.0,
             default_thinking_budget=2000
         )
     elif key == "openai":
+        from services.openai.OpenAIChatProvider import OpenAIChatProvider
         return OpenAIChatProvider(
             default_model_name=os.getenv("OPENAI_MODEL", "gpt-4.1"),
             default_temperature=1.0,
@@ -170,6 +210,63 @@ def get_chat_provider_by_name(provider_name: str, thinking_budget: int = 8000) -
     return _build_chat_provider(provider_name, thinking_budget)
 
 
+async def warm_up_providers() -> None:
+    """
+    Build the startup-critical providers concurrently and pre-open their connections.
+    
+    Blocking construction (bucket check, response cache, chat and embedding
+    clients) runs in parallel worker threads so credential and transport
+    setup stay off the event loop. The chat and embedding clients then each
+    make one cheap call so the TLS handshake and auth token fetch happen
+    before the first user request. Failures are logged; providers are
+    rebuilt lazily on demand. Disable with WARM_UP_PROVIDERS=false.
+    """
+    if os.getenv("WARM_UP_PROVIDERS", "true").lower() == "false":
+        return
+    
+    started = time.perf_counter()
+    # get_chat_response_cache builds the embedding provider when enabled
+    bucket, response_cache, chat_provider = await asyncio.gather(
+        asyncio.to_thread(lambda: get_storage_provider().ensure_bucket()),
+        asyncio.to_thread(get_chat_response_cache),
+        asyncio.to_thread(get_chat_provider),
+        return_exceptions=True
+    )
+    for result in (bucket, response_cache, chat_provider):
+        if isinstance(result, Exception):
+            logger.warning(f"Provider initialization failed during warm-up: {result}")
+    
+    warm_ups = []
+    if not isinstance(chat_provider, Exception):
+        warm_ups.append(chat_provider.warm_up())
+    if response_cache is not None and not isinstance(response_cache, Exception):
+        warm_ups.append(get_embedding_provider().warm_up())
+    
+    for result in await asyncio.gather(*warm_ups, return_exceptions=True):
+        if isinstance(result, Exception):
+            logger.warning(f"Provider warm-up call failed: {result}")
+    
+    logger.info(f"Provider warm-up finished in {time.perf_counter() - started:.2f}s")
+
+
+async def close_providers() -> None:
+    """
+    Release the thread pools and HTTP clients of providers built in this process.
+    
+    Providers that were never requested are skipped rather than constructed
+    just to be closed. Failures are logged so one provider can't block the rest.
+    """
+    closers = []
+    if get_storage_provider.cache_info().currsize:
+        closers.append(get_storage_provider().aclose())
+    if get_video_generation_provider.cache_info().currsize:
+        closers.append(get_video_generation_provider().aclose())
+    
+    for result in await asyncio.gather(*closers, return_exceptions=True):
+        if isinstance(result, Exception):
+            logger.warning(f"Provider shutdown failed: {result}")
+
+
 def get_media_analysis_service():
     """
     Factory function for MediaAnalysisService.
@@ -262,6 +359,8 @@ def get_image_generation_provider() -> ImageGenerationProvider:
     Returns:
         ImageGenerationProvider instance (ImagenGenerationProvider)
     """
+    from services.google.ImagenGenerationProvider import ImagenGenerationProvider
+    
     return ImagenGenerationProvider(
         project_id=os.getenv("GOOGLE_CLOUD_PROJECT"),
         location=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1"),
@@ -282,6 +381,8 @@ def get_video_generation_provider() -> VideoGenerationProvider:
     Returns:
         VideoGenerationProvider instance (VEOGenerationProvider)
     """
+    from services.google.VEOGenerationProvider import VEOGenerationProvider
+    
     return VEOGenerationProvider(
         project_id=os.getenv("GOOGLE_CLOUD_PROJECT"),
         location=os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1"),
@@ -16,6 +16,7 @@ from api.stock_router import router as stock_router
 from api.media_router import router as media_router
 from api.upload_router import router as upload_router
 from api.agent_router import router as agent_router
+from core.dependencies import warm_up_providers, close_providers
 
 # Load environment variables
 load_dotenv()
@@ -54,6 +55,16 @@ app.include_router(media_router, prefix="/api/v1/media", tags=["Media Generation
 app.include_router(upload_router, prefix="/api/v1/upload", tags=["Media Upload"])
 app.include_router(agent_router, prefix="/api/v1/agent", tags=["Agent"])
 
+# Build providers and open their connections before the first request
+@app.on_event("startup")
+async def startup_warm_up():
+    await warm_up_providers()
+
+# Let in-flight Veo calls finish and release pooled connections
+@app.on_event("shutdown")
+async def shutdown_providers():
+    await close_providers()
+
 # Health check endpoint
 @app.get("/api/v1/health")
 async def health_check():
@@ -36,7 +36,7 @@ class MediaGenerationRequest(BaseModel):
     
     voice_settings: Optional[Dict[str, Any]] = Field(
         default=None,
-        description="Voice generation settings (audio only): voice_id, language_code, style_prompt, speaking_rate, pitch"
+        description="Voice generation settings (audio only): voice_id, language_code, style_prompt, speaking_rate, pitch, quality ('fast' or 'high')"
     )
     
     resolution: str = Field(
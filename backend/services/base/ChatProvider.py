@@ -11,7 +11,7 @@ from dataclasses import dataclass, field
 from datetime import datetime
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatMessage:
     """
     Represents a single message in a conversation.
@@ -140,6 +140,33 @@ class ChatProvider(ABC):
         """
         pass
     
+    async def stream_chat_response_with_schema(
+        self,
+        messages: List[ChatMessage],
+        response_schema: Dict[str, Any],
+        array_field: str = "items",
+        **kwargs
+    ) -> AsyncIterator[Any]:
+        """
+        Stream the elements of one array in a structured response as they complete.
+        
+        The default implementation waits for generate_chat_response_with_schema
+        and then yields the elements of response[array_field]; providers with
+        streaming structured output override it to yield incrementally.
+        
+        Args:
+            messages: List of conversation messages
+            response_schema: JSON schema defining the expected response structure
+            array_field: Top-level key of the array whose elements are yielded
+            **kwargs: Passed to generate_chat_response_with_schema
+            
+        Yields:
+            Array elements in order
+        """
+        result = await self.generate_chat_response_with_schema(messages, response_schema, **kwargs)
+        for item in result.get(array_field) or []:
+            yield item
+    
     @abstractmethod
     async def count_tokens(
         self,
@@ -163,3 +190,13 @@ class ChatProvider(ABC):
             ValueError: If messages are invalid
         """
         pass
+    
+    async def warm_up(self) -> None:
+        """
+        Pre-establish the provider's connection before the first real request.
+        
+        Optional hook called at application startup; the default is a no-op.
+        Implementations should make a cheap metadata call and let errors
+        propagate so the caller can log them.
+        """
+        return None
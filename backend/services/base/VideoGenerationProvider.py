@@ -2,7 +2,8 @@
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Optional, Any
+from io import BytesIO
+from typing import BinaryIO, Optional, Any
 from datetime import datetime
 from PIL import Image
 
@@ -23,8 +24,13 @@ class VideoGenerationOperation:
 
 @dataclass
 class GeneratedVideo:
-    """Result of a completed video generation."""
-    video_data: bytes
+    """
+    Result of a completed video generation.
+    
+    Providers may hand the video back as a (spooled) file in video_file
+    instead of bytes; video_data is then None until read_bytes() is called.
+    """
+    video_data: Optional[bytes]
     prompt: str
     duration_seconds: float
     width: int
@@ -32,6 +38,27 @@ class GeneratedVideo:
     file_size: int
     format: str = "mp4"
     metadata: Optional[dict] = None
+    video_file: Optional[BinaryIO] = None
+    
+    def open_stream(self) -> BinaryIO:
+        """Return a readable stream over the video, positioned at the start."""
+        if self.video_file is not None:
+            self.video_file.seek(0)
+            return self.video_file
+        return BytesIO(self.video_data or b"")
+    
+    def read_bytes(self) -> bytes:
+        """Return the video bytes, reading them from video_file on first use."""
+        if self.video_data is None and self.video_file is not None:
+            self.video_file.seek(0)
+            self.video_data = self.video_file.read()
+        return self.video_data or b""
+    
+    def close(self) -> None:
+        """Release the backing file, if any."""
+        if self.video_file is not None:
+            self.video_file.close()
+            self.video_file = None
 
 
 class VideoGenerationProvider(ABC):
@@ -42,6 +42,8 @@ class VoiceGenerationRequest:
         audio_encoding: Output format ("MP3", "WAV", "OGG")
         sample_rate_hertz: Audio sample rate (8000, 16000, 24000, etc.)
         effects_profile_id: Optional audio effects (e.g., ["telephony-class-application"])
+        quality: "fast" (low-latency model, default) or "high" (highest-quality model,
+                 worth it for nuanced emotional direction in style_prompt)
         metadata: Optional additional parameters
     """
     text: str
@@ -53,6 +55,7 @@ class VoiceGenerationRequest:
     audio_encoding: str = "MP3"
     sample_rate_hertz: int = 24000
     effects_profile_id: List[str] = field(default_factory=list)
+    quality: str = "fast"
     metadata: Optional[Dict[str, Any]] = None
 
 
@@ -3,27 +3,149 @@
 import os
 import uuid
 import logging
+import queue
+import re
 import time
 from typing import BinaryIO, Optional, List, Dict, Any
 from datetime import datetime
 from google.cloud import storage
 from google.cloud.exceptions import NotFound, Conflict
+from requests.adapters import HTTPAdapter
 import httpx
 import asyncio
-from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 from services.base.StorageProvider import StorageProvider, StorageFile, UploadResult
+from utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Resumable upload chunk size (must be a multiple of 256 KiB)
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Size of chunks pulled from the source URL
+STREAM_DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# Max downloaded chunks buffered ahead of the uploader
+STREAM_QUEUE_DEPTH = 16
+# Seconds the uploader waits for the next downloaded chunk before giving up
+STREAM_READ_TIMEOUT = 120
 
-def async_wrap(func):
-    """Decorator to run sync GCS operations in executor."""
-    @wraps(func)
-    async def wrapper(*args, **kwargs):
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, lambda: func(*args, **kwargs))
-    return wrapper
+# Streams at or below this size upload with one signed-URL PUT instead of the SDK
+DIRECT_PUT_MAX_SIZE = 4 * 1024 * 1024
+
+# How long a generated signed URL is reused before re-signing
+SIGNED_URL_CACHE_TTL = 300
+
+# Max objects per list_blobs page (GCS caps pages at 1000)
+LIST_PAGE_SIZE = 1000
+# Only the fields StorageFile needs, to shrink list responses
+_LIST_FIELDS = "items(name,size,contentType,timeCreated,updated,metadata),nextPageToken"
+
+# Filename sanitization patterns
+_SANITIZE_RE = re.compile(r'[^a-zA-Z0-9_-]')
+_MULTI_UNDERSCORE_RE = re.compile(r'_+')
+
+
+def _stream_size(file_data: BinaryIO) -> Optional[int]:
+    """Return the total size of a seekable stream (rewound to 0), or None if unknown."""
+    try:
+        file_data.seek(0, os.SEEK_END)
+        size = file_data.tell()
+        file_data.seek(0)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+class SyncQueueReader:
+    """
+    Blocking file-like reader fed by an async producer.
+    
+    Lets the synchronous GCS SDK consume bytes as they arrive from an
+    async HTTP download. The producer runs on the event loop and never
+    occupies a pool thread: put() awaits a free slot (at most
+    STREAM_QUEUE_DEPTH chunks buffered) and each chunk read() consumes
+    hands its slot back to the loop, so memory stays at
+    O(STREAM_QUEUE_DEPTH * chunk) instead of O(file size).
+    
+    The stream is forward-only; seek() only accepts the current position.
+    """
+    
+    _EOF = object()
+    
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        maxsize: int = STREAM_QUEUE_DEPTH,
+        read_timeout: float = STREAM_READ_TIMEOUT
+    ):
+        self._loop = loop
+        # Unbounded on its own; the slots semaphore provides the backpressure
+        self._queue: queue.Queue = queue.Queue()
+        self._slots = asyncio.Semaphore(maxsize)
+        self._read_timeout = read_timeout
+        self._buffer = bytearray()
+        self._position = 0
+        self._eof = False
+        self.closed = False
+    
+    async def put(self, chunk: bytes) -> None:
+        """Enqueue a chunk from the event loop, waiting while the buffer is full."""
+        await self._slots.acquire()
+        if self.closed:
+            return
+        self._queue.put_nowait(chunk)
+    
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """Signal end of stream, optionally propagating a producer error."""
+        self._queue.put_nowait(error if error is not None else self._EOF)
+    
+    def read(self, size: int = -1) -> bytes:
+        """Read up to size bytes, blocking until they are available or EOF."""
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            try:
+                item = self._queue.get(timeout=self._read_timeout)
+            except queue.Empty:
+                raise TimeoutError(f"No data from source for {self._read_timeout}s")
+            if item is self._EOF:
+                self._eof = True
+            elif isinstance(item, BaseException):
+                raise item
+            else:
+                self._buffer.extend(item)
+                self._loop.call_soon_threadsafe(self._slots.release)
+        
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self._position += len(data)
+        return data
+    
+    def tell(self) -> int:
+        return self._position
+    
+    def seekable(self) -> bool:
+        return False
+    
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        """No-op at the current position; the stream can't rewind for a retry."""
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        if whence not in (os.SEEK_SET, os.SEEK_CUR) or offset != self._position:
+            raise OSError("SyncQueueReader is forward-only and cannot seek")
+        return self._position
+    
+    def close(self) -> None:
+        """Stop accepting chunks, drop anything buffered and wake a blocked read()."""
+        self.closed = True
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        # A cancelled or failed upload may still have a pool thread waiting in read()
+        self._queue.put_nowait(ValueError("I/O operation on closed SyncQueueReader"))
 
 
 class GCStorageProvider(StorageProvider):
@@ -44,7 +166,9 @@ class GCStorageProvider(StorageProvider):
         bucket_name: Optional[str] = None,
         location: str = "us-central1",
         signed_url_expiration_days: int = 7,
-        credentials_path: Optional[str] = None
+        credentials_path: Optional[str] = None,
+        http_pool_size: int = 32,
+        max_workers: int = 32
     ):
         """
         Initialize GCS storage provider.
@@ -55,6 +179,8 @@ class GCStorageProvider(StorageProvider):
             location: GCS bucket location
             signed_url_expiration_days: Default expiration for signed URLs
             credentials_path: Path to service account JSON (uses ADC if not provided)
+            http_pool_size: Max pooled keep-alive connections to the GCS API
+            max_workers: Size of the dedicated thread pool for blocking GCS calls
         """
         self.project_id = project_id
         self.bucket_name = bucket_name or os.getenv("GCS_BUCKET_NAME", "screenwrite-media")
@@ -72,16 +198,61 @@ class GCStorageProvider(StorageProvider):
             self.client = storage.Client(project=project_id)
             logger.info("GCS client initialized with Application Default Credentials")
         
-        # Cache bucket after first access
-        self._bucket_cache: Optional[storage.Bucket] = None
+        self._configure_http_pool(http_pool_size)
+        
+        # Dedicated pool so GCS I/O doesn't queue behind other blocking work on the default executor
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="gcs")
+        
+        # Shared HTTP client for URL downloads (keeps DNS/TLS warm across calls)
+        self._http = httpx.AsyncClient(
+            http2=True,
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+        )
+        
+        # Signed URLs keyed by (path, expiration_seconds)
+        self._signed_url_cache = TTLCache(maxsize=10000, ttl=SIGNED_URL_CACHE_TTL)
+        
+        # Local bucket handle (no network); existence + CORS are verified once by ensure_bucket()
+        self._bucket: storage.Bucket = self.client.bucket(self.bucket_name)
+        self._configured = False
         
         logger.info(f"GCStorageProvider initialized: bucket={self.bucket_name}, location={self.location}")
     
+    async def aclose(self) -> None:
+        """Close pooled network resources."""
+        await self._http.aclose()
+        self._executor.shutdown(wait=False)
+    
+    async def _run_sync(self, func, *args):
+        """Run a sync GCS operation on the provider's thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+    
+    def _configure_http_pool(self, pool_size: int) -> None:
+        """
+        Widen the client's HTTP connection pool.
+        
+        The default requests pool keeps only 10 connections per host, so
+        concurrent blob operations beyond that pay a fresh TLS handshake.
+        """
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.client._http.mount("https://", adapter)
+    
     def _get_or_create_bucket(self) -> storage.Bucket:
-        """Get or create bucket with CORS configuration (synchronous)."""
-        if self._bucket_cache is not None:
-            return self._bucket_cache
+        """Return the cached bucket handle, running the one-time setup if needed (synchronous)."""
+        if not self._configured:
+            self.ensure_bucket()
+        return self._bucket
+    
+    def ensure_bucket(self) -> storage.Bucket:
+        """
+        Get or create bucket with CORS configuration (synchronous).
         
+        Issues the metadata GET and CORS patch once; call at service startup
+        so per-request operations only use the local bucket handle.
+        """
         try:
             bucket = self.client.get_bucket(self.bucket_name)
             
@@ -108,7 +279,8 @@ class GCStorageProvider(StorageProvider):
                 logger.info(f"CORS configured for bucket '{self.bucket_name}'")
             
             logger.info(f"Using existing bucket '{self.bucket_name}'")
-            self._bucket_cache = bucket
+            self._bucket = bucket
+            self._configured = True
             return bucket
             
         except NotFound:
@@ -135,14 +307,16 @@ class GCStorageProvider(StorageProvider):
                 bucket.patch()
                 
                 logger.info(f"Bucket '{self.bucket_name}' created successfully")
-                self._bucket_cache = bucket
+                self._bucket = bucket
+                self._configured = True
                 return bucket
                 
             except Conflict:
                 # Race condition: bucket created by another process
                 bucket = self.client.get_bucket(self.bucket_name)
                 logger.info(f"Bucket '{self.bucket_name}' created by another process")
-                self._bucket_cache = bucket
+                self._bucket = bucket
+                self._configured = True
                 return bucket
     
     def _generate_blob_path(self, user_id: str, session_id: str, filename: str) -> tuple[str, str]:
@@ -152,22 +326,24 @@ class GCStorageProvider(StorageProvider):
         Returns:
             tuple: (full_blob_path, sanitized_filename)
         """
-        import re
-        from pathlib import Path
-        
         file_uuid = str(uuid.uuid4())
         
-        # Extract extension
-        file_path = Path(filename)
-        extension = file_path.suffix  # includes the dot, e.g., ".mp4"
-        name_without_ext = file_path.stem
+        # Extract extension (same semantics as Path.suffix / Path.stem)
+        basename = filename.rpartition('/')[2]
+        stem, dot, suffix = basename.rpartition('.')
+        if stem and suffix:
+            extension = dot + suffix  # includes the dot, e.g., ".mp4"
+            name_without_ext = stem
+        else:
+            extension = ''
+            name_without_ext = basename
         
         # Sanitize the filename: replace special characters with underscores
         # Allow only alphanumeric, hyphens, underscores
-        sanitized_name = re.sub(r'[^a-zA-Z0-9_-]', '_', name_without_ext)
+        sanitized_name = _SANITIZE_RE.sub('_', name_without_ext)
         
         # Remove consecutive underscores
-        sanitized_name = re.sub(r'_+', '_', sanitized_name)
+        sanitized_name = _MULTI_UNDERSCORE_RE.sub('_', sanitized_name)
         
         # Remove leading/trailing underscores
         sanitized_name = sanitized_name.strip('_')
@@ -195,6 +371,19 @@ class GCStorageProvider(StorageProvider):
         **kwargs
     ) -> UploadResult:
         """Upload file from binary stream."""
+        # Small files: a single async PUT to a signed URL skips the SDK upload negotiation
+        size = _stream_size(file_data)
+        if size is not None and size <= DIRECT_PUT_MAX_SIZE:
+            final_metadata = metadata or {}
+            if name:
+                final_metadata['name'] = name
+            
+            # Custom metadata travels as x-goog-meta-* headers, which must be ASCII
+            if all(str(value).isascii() for value in final_metadata.values()):
+                return await self._upload_via_signed_put(
+                    file_data, size, user_id, session_id, filename, content_type, final_metadata
+                )
+        
         def _sync_upload():
             bucket = self._get_or_create_bucket()
             blob_path, sanitized_filename = self._generate_blob_path(user_id, session_id, filename)
@@ -213,8 +402,13 @@ class GCStorageProvider(StorageProvider):
             if final_metadata:
                 blob.metadata = final_metadata
             
-            # Upload with automatic retry
-            blob.upload_from_file(file_data, rewind=True)
+            # Large/unknown-size streams go resumable in fixed chunks; small ones stay single-request
+            size = _stream_size(file_data)
+            if size is None or size > UPLOAD_CHUNK_SIZE:
+                blob.chunk_size = UPLOAD_CHUNK_SIZE
+            
+            # if_generation_match=0 makes the create idempotent, so the SDK retries it safely
+            blob.upload_from_file(file_data, rewind=True, if_generation_match=0)
             
             logger.info(f"File uploaded: {blob_path}")
             
@@ -238,7 +432,170 @@ class GCStorageProvider(StorageProvider):
                 sanitized_filename=sanitized_filename
             )
         
-        return await async_wrap(_sync_upload)()
+        return await self._run_sync(_sync_upload)
+    
+    async def _upload_via_signed_put(
+        self,
+        file_data: BinaryIO,
+        size: int,
+        user_id: str,
+        session_id: str,
+        filename: str,
+        content_type: Optional[str],
+        final_metadata: Dict[str, Any]
+    ) -> UploadResult:
+        """Upload a small stream with one PUT to a V4 signed upload URL."""
+        blob_path, sanitized_filename = self._generate_blob_path(user_id, session_id, filename)
+        
+        headers = {
+            "Cache-Control": "public, max-age=31536000",
+            "x-goog-if-generation-match": "0",
+        }
+        for key, value in final_metadata.items():
+            headers[f"x-goog-meta-{key}"] = str(value)
+        
+        def _sync_sign():
+            blob = self._get_or_create_bucket().blob(blob_path)
+            upload_url = blob.generate_signed_url(
+                version="v4",
+                expiration=15 * 60,
+                method="PUT",
+                content_type=content_type,
+                headers=headers
+            )
+            signed_url = blob.generate_signed_url(
+                version="v4",
+                expiration=self.signed_url_expiration_days * 24 * 60 * 60,
+                method="GET"
+            )
+            return upload_url, signed_url, blob.public_url
+        
+        upload_url, signed_url, public_url = await self._run_sync(_sync_sign)
+        
+        request_headers = dict(headers)
+        if content_type:
+            request_headers["Content-Type"] = content_type
+        
+        response = await self._http.put(upload_url, content=file_data.read(), headers=request_headers)
+        response.raise_for_status()
+        
+        logger.info(f"File uploaded: {blob_path}")
+        
+        return UploadResult(
+            path=blob_path,
+            url=public_url,
+            signed_url=signed_url,
+            size=size,
+            content_type=content_type,
+            metadata=final_metadata,
+            sanitized_filename=sanitized_filename
+        )
+    
+    async def upload_path(
+        self,
+        local_path: str,
+        user_id: str,
+        session_id: str,
+        filename: Optional[str] = None,
+        name: Optional[str] = None,
+        content_type: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        checksum: Optional[str] = "crc32c",
+        **kwargs
+    ) -> UploadResult:
+        """
+        Upload a local file by path.
+        
+        Lets the SDK read straight from disk instead of through a Python
+        stream, with server-side integrity checking.
+        
+        Args:
+            local_path: Path of the file on local disk
+            user_id: User ID for isolation
+            session_id: Session ID for isolation
+            filename: Original filename (defaults to the local file's name)
+            name: Display name stored in metadata
+            content_type: MIME type
+            metadata: Additional metadata
+            checksum: "crc32c", "md5" or None
+        """
+        def _sync_upload_path():
+            bucket = self._get_or_create_bucket()
+            blob_path, sanitized_filename = self._generate_blob_path(
+                user_id, session_id, filename or os.path.basename(local_path)
+            )
+            blob = bucket.blob(blob_path)
+            
+            if content_type:
+                blob.content_type = content_type
+            
+            blob.cache_control = "public, max-age=31536000"
+            
+            # Merge name into metadata
+            final_metadata = metadata or {}
+            if name:
+                final_metadata['name'] = name
+            
+            if final_metadata:
+                blob.metadata = final_metadata
+            
+            if os.path.getsize(local_path) > UPLOAD_CHUNK_SIZE:
+                blob.chunk_size = UPLOAD_CHUNK_SIZE
+            
+            blob.upload_from_filename(
+                local_path,
+                content_type=content_type,
+                if_generation_match=0,
+                checksum=checksum
+            )
+            
+            logger.info(f"File uploaded: {blob_path}")
+            
+            signed_url = blob.generate_signed_url(
+                version="v4",
+                expiration=self.signed_url_expiration_days * 24 * 60 * 60,
+                method="GET"
+            )
+            
+            return UploadResult(
+                path=blob_path,
+                url=blob.public_url,
+                signed_url=signed_url,
+                size=blob.size or 0,
+                content_type=content_type,
+                metadata=final_metadata,
+                sanitized_filename=sanitized_filename
+            )
+        
+        return await self._run_sync(_sync_upload_path)
+    
+    async def upload_files_batch(
+        self,
+        items: List[tuple[BinaryIO, str, str, str]],
+        max_concurrency: int = 32,
+        **kwargs
+    ) -> List[UploadResult]:
+        """
+        Upload many files concurrently.
+        
+        Total concurrency is also bounded globally by the provider's
+        thread pool (max_workers), shared with all other GCS operations.
+        
+        Args:
+            items: (file_data, user_id, session_id, filename) tuples
+            max_concurrency: Max uploads in flight for this batch
+            **kwargs: Passed through to upload_file
+            
+        Returns:
+            UploadResults in the same order as items
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def _upload_one(file_data: BinaryIO, user_id: str, session_id: str, filename: str) -> UploadResult:
+            async with semaphore:
+                return await self.upload_file(file_data, user_id, session_id, filename, **kwargs)
+        
+        return await asyncio.gather(*(_upload_one(*item) for item in items))
     
     async def upload_from_url(
         self,
@@ -261,56 +618,91 @@ class GCStorageProvider(StorageProvider):
             final_filename = filename
         
         # Get bucket (sync operation wrapped in executor)
-        loop = asyncio.get_event_loop()
-        bucket = await loop.run_in_executor(None, self._get_or_create_bucket)
+        loop = asyncio.get_running_loop()
+        bucket = await loop.run_in_executor(self._executor, self._get_or_create_bucket)
         
         blob_path, sanitized_filename = self._generate_blob_path(user_id, session_id, final_filename)
         blob = bucket.blob(blob_path)
         
-        logger.info(f"Streaming from URL to GCS: {url} -> {blob_path}")
+        # Blob properties that don't depend on the response are set before the request
+        blob.cache_control = "public, max-age=31536000"
+        blob.chunk_size = UPLOAD_CHUNK_SIZE
+        
+        # Merge name into metadata
+        final_metadata = metadata or {}
+        if name:
+            final_metadata['name'] = name
+        
+        if final_metadata:
+            blob.metadata = final_metadata
         
         # Stream directly from URL to GCS using async HTTP
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            async with client.stream('GET', url) as response:
-                response.raise_for_status()
-                
-                content_type = response.headers.get('Content-Type')
-                if content_type:
-                    blob.content_type = content_type
-                
-                blob.cache_control = "public, max-age=31536000"
-                
-                # Merge name into metadata
-                final_metadata = metadata or {}
-                if name:
-                    final_metadata['name'] = name
-                
-                if final_metadata:
-                    blob.metadata = final_metadata
-                
-                content_length = response.headers.get('Content-Length')
-                content_length_int = int(content_length) if content_length else None
-                
-                if content_length_int:
-                    file_size_mb = content_length_int / 1024 / 1024
-                    logger.info(f"File size: {file_size_mb:.2f} MB")
-                
-                # Read content and upload to GCS
-                content = await response.aread()
-                
-                # Upload from bytes (GCS SDK is sync, but we've minimized blocking by using async HTTP)
-                await loop.run_in_executor(
-                    None,
-                    lambda: blob.upload_from_string(content, content_type=content_type)
+        async with self._http.stream('GET', url) as response:
+            response.raise_for_status()
+            
+            content_type = response.headers.get('Content-Type')
+            if content_type:
+                blob.content_type = content_type
+            
+            content_length = response.headers.get('Content-Length')
+            content_length_int = int(content_length) if content_length else None
+            
+            # Content-Length is the encoded size when the body is compressed
+            upload_size = None if response.headers.get('Content-Encoding') else content_length_int
+            
+            # Pipe download chunks straight into a resumable GCS upload.
+            # The pump stays on the event loop so it can't be starved of pool threads
+            # by uploads blocked in read().
+            reader = SyncQueueReader(loop)
+            
+            async def _pump():
+                try:
+                    async for chunk in response.aiter_bytes(STREAM_DOWNLOAD_CHUNK_SIZE):
+                        if reader.closed:
+                            return
+                        await reader.put(chunk)
+                    reader.finish()
+                except Exception as e:
+                    reader.finish(e)
+            
+            # Kick off both halves before any logging
+            pump_task = asyncio.create_task(_pump())
+            upload_future = loop.run_in_executor(
+                self._executor,
+                partial(
+                    blob.upload_from_file,
+                    reader,
+                    size=upload_size,
+                    content_type=content_type,
+                    # A retried chunk would need to rewind the stream, which it can't
+                    retry=None
                 )
+            )
+            
+            logger.info(f"Streaming from URL to GCS: {url} -> {blob_path}")
+            if content_length_int:
+                file_size_mb = content_length_int / 1024 / 1024
+                logger.info(f"File size: {file_size_mb:.2f} MB")
+            
+            try:
+                await upload_future
+            finally:
+                reader.close()
+                # The pump may be parked waiting for a slot the uploader will never free
+                pump_task.cancel()
+                try:
+                    await pump_task
+                except asyncio.CancelledError:
+                    pass
         
         total_time = time.time() - start_time
         logger.info(f"Upload completed in {total_time:.2f}s")
         
         # Generate signed URL (sync operation wrapped)
         signed_url = await loop.run_in_executor(
-            None,
-            lambda: blob.generate_signed_url(
+            self._executor,
+            partial(
+                blob.generate_signed_url,
                 version="v4",
                 expiration=self.signed_url_expiration_days * 24 * 60 * 60,
                 method="GET"
@@ -330,18 +722,37 @@ class GCStorageProvider(StorageProvider):
             sanitized_filename=sanitized_filename
         )
     
-    async def download_file(self, path: str, **kwargs) -> bytes:
-        """Download file content as bytes."""
+    async def download_file(
+        self,
+        path: str,
+        offset: Optional[int] = None,
+        length: Optional[int] = None,
+        **kwargs
+    ) -> bytes:
+        """
+        Download file content as bytes.
+        
+        Args:
+            path: Full path to file
+            offset: Optional start byte for a ranged read
+            length: Optional number of bytes to read from offset
+        """
         def _sync_download():
             bucket = self._get_or_create_bucket()
             blob = bucket.blob(path)
             
-            if not blob.exists():
-                raise FileNotFoundError(f"File not found: {path}")
+            start = offset
+            end = None
+            if length is not None:
+                end = (offset or 0) + length - 1  # inclusive
             
-            return blob.download_as_bytes()
+            # No exists() pre-check: the download itself 404s for missing blobs
+            try:
+                return blob.download_as_bytes(start=start, end=end)
+            except NotFound:
+                raise FileNotFoundError(f"File not found: {path}")
         
-        return await async_wrap(_sync_download)()
+        return await self._run_sync(_sync_download)
     
     async def delete_file(self, path: str, **kwargs) -> bool:
         """Delete a file from GCS."""
@@ -356,7 +767,7 @@ class GCStorageProvider(StorageProvider):
                 logger.warning(f"File not found for deletion: {path}")
                 return False
         
-        return await async_wrap(_sync_delete)()
+        return await self._run_sync(_sync_delete)
     
     async def file_exists(self, path: str, **kwargs) -> bool:
         """Check if file exists."""
@@ -365,7 +776,7 @@ class GCStorageProvider(StorageProvider):
             blob = bucket.blob(path)
             return blob.exists()
         
-        return await async_wrap(_sync_exists)()
+        return await self._run_sync(_sync_exists)
     
     async def list_files(
         self,
@@ -376,11 +787,16 @@ class GCStorageProvider(StorageProvider):
         """List files with given prefix."""
         def _sync_list():
             bucket = self._get_or_create_bucket()
-            blobs = bucket.list_blobs(prefix=prefix, max_results=limit)
+            page_size = min(limit, LIST_PAGE_SIZE) if limit else LIST_PAGE_SIZE
+            blobs = bucket.list_blobs(
+                prefix=prefix,
+                max_results=limit,
+                page_size=page_size,
+                fields=_LIST_FIELDS
+            )
             
-            files = []
-            for blob in blobs:
-                files.append(StorageFile(
+            return [
+                StorageFile(
                     path=blob.name,
                     name=blob.name.split('/')[-1],
                     size=blob.size or 0,
@@ -388,11 +804,11 @@ class GCStorageProvider(StorageProvider):
                     created_at=blob.time_created,
                     updated_at=blob.updated,
                     metadata=blob.metadata
-                ))
-            
-            return files
+                )
+                for blob in blobs
+            ]
         
-        return await async_wrap(_sync_list)()
+        return await self._run_sync(_sync_list)
     
     async def generate_signed_url(
         self,
@@ -401,6 +817,14 @@ class GCStorageProvider(StorageProvider):
         **kwargs
     ) -> str:
         """Generate signed URL for temporary access."""
+        # Only reuse URLs that stay valid well past the cache window
+        cacheable = expiration_seconds > 2 * SIGNED_URL_CACHE_TTL
+        cache_key = (path, expiration_seconds)
+        if cacheable:
+            cached = self._signed_url_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        
         def _sync_generate_signed_url():
             bucket = self._get_or_create_bucket()
             blob = bucket.blob(path)
@@ -411,7 +835,10 @@ class GCStorageProvider(StorageProvider):
                 method="GET"
             )
         
-        return await async_wrap(_sync_generate_signed_url)()
+        signed_url = await self._run_sync(_sync_generate_signed_url)
+        if cacheable:
+            self._signed_url_cache.set(cache_key, signed_url)
+        return signed_url
     
     async def get_public_url(self, path: str, **kwargs) -> str:
         """Get public URL for a file."""
@@ -420,7 +847,7 @@ class GCStorageProvider(StorageProvider):
             blob = bucket.blob(path)
             return blob.public_url
         
-        return await async_wrap(_sync_get_public_url)()
+        return await self._run_sync(_sync_get_public_url)
     
     async def get_existing_names(self, user_id: str, session_id: str) -> set[str]:
         """
@@ -438,7 +865,11 @@ class GCStorageProvider(StorageProvider):
         def _sync_get_names():
             bucket = self._get_or_create_bucket()
             prefix = f"{user_id}/{session_id}/"
-            blobs = bucket.list_blobs(prefix=prefix)
+            blobs = bucket.list_blobs(
+                prefix=prefix,
+                page_size=LIST_PAGE_SIZE,
+                fields="items(name,metadata),nextPageToken"
+            )
             
             names = set()
             for blob in blobs:
@@ -447,4 +878,4 @@ class GCStorageProvider(StorageProvider):
             
             return names
         
-        return await async_wrap(_sync_get_names)()
+        return await self._run_sync(_sync_get_names)
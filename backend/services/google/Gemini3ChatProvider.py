@@ -1,6 +1,5 @@
 """Google Gemini 3.0 implementation using Vertex AI with thinking levels."""
 
-import json
 import logging
 import os
 from typing import List, Dict, Any, AsyncIterator, Optional, Literal
@@ -8,6 +7,7 @@ from google import genai
 from google.genai import types
 
 from services.base.ChatProvider import ChatProvider, ChatMessage, ChatResponse
+from utils.json_utils import loads_json
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +24,18 @@ class Gemini3ChatProvider(ChatProvider):
     - Workload Identity (for GKE/Cloud Run)
     """
     
+    # Request config constants shared by every call
+    _SAFETY_SETTINGS = [
+        types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
+        types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
+        types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
+        types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
+    ]
+    _THINKING_CONFIGS = {
+        "low": types.ThinkingConfig(thinking_level=types.ThinkingLevel.LOW),
+        "high": types.ThinkingConfig(thinking_level=types.ThinkingLevel.HIGH),
+    }
+    
     def __init__(
         self,
         project_id: Optional[str] = None,
@@ -100,27 +112,31 @@ class Gemini3ChatProvider(ChatProvider):
         Returns:
             (system_instruction, contents)
         """
-        system_instruction = None
+        system_parts = []
         conversation_messages = []
         
         # Separate system messages from conversation
         for msg in messages:
             if msg.role == "system":
-                system_instruction = msg.content if not system_instruction else system_instruction + "\n\n" + msg.content
+                system_parts.append(msg.content)
             else:
                 conversation_messages.append(msg)
         
+        system_instruction = "\n\n".join(system_parts) if system_parts else None
+        
         # Convert conversation to plain text format (bypasses role alternation)
         if conversation_messages:
-            conversation_text = "=== CONVERSATION HISTORY ===\n\n"
+            # Build with a list + join to stay linear in total history size
+            parts = ["=== CONVERSATION HISTORY ===\n\n"]
             
             for msg in conversation_messages:
                 if msg.role == "user":
-                    conversation_text += f"USER: {msg.content}\n\n"
+                    parts.append(f"USER: {msg.content}\n\n")
                 elif msg.role in ["assistant", "tool"]:
-                    conversation_text += f"AGENT: {msg.content}\n\n"
+                    parts.append(f"AGENT: {msg.content}\n\n")
             
-            conversation_text += "=== END HISTORY ===\n\nGenerate the next AGENT response (ONLY ONE response, not multiple):"
+            parts.append("=== END HISTORY ===\n\nGenerate the next AGENT response (ONLY ONE response, not multiple):")
+            conversation_text = "".join(parts)
             
             # Return as single user message
             contents = [types.Content(role="user", parts=[types.Part.from_text(text=conversation_text)])]
@@ -130,6 +146,40 @@ class Gemini3ChatProvider(ChatProvider):
         
         return system_instruction, contents
     
+    def _build_config(
+        self,
+        think_level: str,
+        temperature: float,
+        max_tokens: Optional[int],
+        system_inst: Optional[str],
+        extra: Dict[str, Any]
+    ) -> types.GenerateContentConfig:
+        """
+        Build the GenerateContentConfig shared by all request methods.
+        
+        Args:
+            think_level: "low" or "high"
+            temperature: Sampling temperature
+            max_tokens: Optional output token cap
+            system_inst: Optional system instruction
+            extra: Method-specific params and caller kwargs
+        """
+        config_params = {
+            'temperature': temperature,
+            'top_p': 0.95,
+            'safety_settings': self._SAFETY_SETTINGS,
+            'thinking_config': self._THINKING_CONFIGS["low" if think_level == "low" else "high"],
+            **extra
+        }
+        
+        if system_inst:
+            config_params['system_instruction'] = system_inst
+        
+        if max_tokens:
+            config_params['max_output_tokens'] = max_tokens
+        
+        return types.GenerateContentConfig(**config_params)
+    
     async def generate_chat_response(
         self,
         messages: List[ChatMessage],
@@ -147,34 +197,12 @@ class Gemini3ChatProvider(ChatProvider):
         temp = temperature if temperature is not None else self.default_temperature
         think_level = thinking_level if thinking_level is not None else self.default_thinking_level
         
-        # Use official ThinkingLevel enum from google.genai.types
-        # Low thinking: types.ThinkingLevel.LOW
-        # High thinking: types.ThinkingLevel.HIGH
-        thinking_level_enum = types.ThinkingLevel.LOW if think_level == "low" else types.ThinkingLevel.HIGH
-        
-        config_params = {
-            'temperature': temp,
-            'top_p': 0.95,
-            'safety_settings': [
-                types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
-            ],
-            'thinking_config': types.ThinkingConfig(thinking_level=thinking_level_enum),
-            **kwargs
-        }
-        
-        if system_inst:
-            config_params['system_instruction'] = system_inst
+        config = self._build_config(think_level, temp, max_tokens, system_inst, kwargs)
         
-        if max_tokens:
-            config_params['max_output_tokens'] = max_tokens
-        
-        response = self.client.models.generate_content(
+        response = await self.client.aio.models.generate_content(
             model=model,
             contents=contents,
-            config=types.GenerateContentConfig(**config_params)
+            config=config
         )
         
         usage = None
@@ -209,33 +237,13 @@ class Gemini3ChatProvider(ChatProvider):
         temp = temperature if temperature is not None else self.default_temperature
         think_level = thinking_level if thinking_level is not None else self.default_thinking_level
         
-        # Use official ThinkingLevel enum from google.genai.types
-        # Low thinking: types.ThinkingLevel.LOW
-        # High thinking: types.ThinkingLevel.HIGH
-        thinking_level_enum = types.ThinkingLevel.LOW if think_level == "low" else types.ThinkingLevel.HIGH
+        config = self._build_config(think_level, temp, max_tokens, system_inst, kwargs)
         
-        config_params = {
-            'temperature': temp,
-            'top_p': 0.95,
-            'safety_settings': [
-                types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
-            ],
-            'thinking_config': types.ThinkingConfig(thinking_level=thinking_level_enum),
-            **kwargs
-        }
-        
-        if max_tokens:
-            config_params['max_output_tokens'] = max_tokens
-        if system_inst:
-            config_params['system_instruction'] = system_inst
-        
-        for chunk in self.client.models.generate_content_stream(
+        # Native async stream: no thread hop per chunk
+        async for chunk in await self.client.aio.models.generate_content_stream(
             model=model,
             contents=contents,
-            config=types.GenerateContentConfig(**config_params)
+            config=config
         ):
             if hasattr(chunk, 'text') and chunk.text:
                 yield chunk.text
@@ -245,10 +253,14 @@ class Gemini3ChatProvider(ChatProvider):
         if not text:
             return "{}"
             
+        # Common case with response_mime_type='application/json': no fences to strip
+        if "```" not in text:
+            return text.strip()
+        
         # Remove markdown code blocks if present
         if "```json" in text:
             text = text.split("```json")[1].split("```")[0]
-        elif "```" in text:
+        else:
             text = text.split("```")[1].split("```")[0]
             
         return text.strip()
@@ -270,43 +282,58 @@ class Gemini3ChatProvider(ChatProvider):
         temp = temperature if temperature is not None else self.default_temperature
         think_level = thinking_level if thinking_level is not None else self.default_thinking_level
         
-        # Use official ThinkingLevel enum from google.genai.types
-        # Low thinking: types.ThinkingLevel.LOW
-        # High thinking: types.ThinkingLevel.HIGH
-        thinking_level_enum = types.ThinkingLevel.LOW if think_level == "low" else types.ThinkingLevel.HIGH
-        
-        config_params = {
-            'temperature': temp,
-            'top_p': 0.95,
-            'safety_settings': [
-                types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
-            ],
-            'thinking_config': types.ThinkingConfig(thinking_level=thinking_level_enum),
-            'response_mime_type': 'application/json',
-            'response_json_schema': response_schema,
-            **kwargs
-        }
-        
-        if system_inst:
-            config_params['system_instruction'] = system_inst
+        config = self._build_config(
+            think_level,
+            temp,
+            None,
+            system_inst,
+            {
+                'response_mime_type': 'application/json',
+                'response_json_schema': response_schema,
+                **kwargs
+            }
+        )
         
-        response = self.client.models.generate_content(
+        response = await self.client.aio.models.generate_content(
             model=model,
             contents=contents,
-            config=types.GenerateContentConfig(**config_params)
+            config=config
         )
         
         # With response_json_schema, the model should return valid JSON
         # But we still clean it just in case, as thinking models can sometimes be verbose
         text = self._clean_json_response(response.text)
             
-        return json.loads(text)
+        return loads_json(text)
+    
+    async def warm_up(self) -> None:
+        """Open the pooled connection (TLS + auth token) with a cheap model lookup."""
+        await self.client.aio.models.get(model=self.default_model_name)
     
     async def count_tokens(self, messages: List[ChatMessage], model_name: Optional[str] = None, **kwargs) -> int:
+        """
+        Count tokens with the model's count_tokens endpoint.
+        
+        Counts the serialized history plus any system instruction in a
+        single API call, so the number matches what a request would send.
+        Falls back to a ~4 chars/token estimate if the API call fails.
+        """
         if not messages:
             raise ValueError("Messages cannot be empty")
-        text = "\n".join([f"{m.role}: {m.content}" for m in messages])
-        return len(text) // 4  # Rough estimate
+        
+        system_inst, contents = self._convert_messages(messages)
+        if system_inst:
+            # Count the system instruction as content; the Gemini API count endpoint
+            # doesn't accept system_instruction in API-key mode
+            contents = [types.Content(role="user", parts=[types.Part.from_text(text=system_inst)]), *contents]
+        
+        try:
+            response = await self.client.aio.models.count_tokens(
+                model=model_name or self.default_model_name,
+                contents=contents
+            )
+        except Exception as e:
+            logger.warning(f"count_tokens API failed, using estimate: {e}")
+            text = "\n".join([f"{m.role}: {m.content}" for m in messages])
+            return len(text) // 4  # Rough estimate
+        return response.total_tokens or 0
@@ -1,16 +1,84 @@
 """Google Gemini implementation using Vertex AI."""
 
+import asyncio
+import copy
+import hashlib
 import json
 import logging
 import os
-from typing import List, Dict, Any, AsyncIterator, Optional
+import time
+from functools import lru_cache
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 from google import genai
 from google.genai import types
 
 from services.base.ChatProvider import ChatProvider, ChatMessage, ChatResponse
+from services.google.genai_http import pooled_http_options
+from utils.cache import TTLCache
+from utils.json_utils import loads_json
+from utils.semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
+# Explicit context caches need a minimum prompt size (~2048 tokens ≈ 8k chars)
+CONTEXT_CACHE_MIN_CHARS = 2048 * 4
+CONTEXT_CACHE_TTL_SECONDS = 600
+# Stop reusing a cache this long before it expires server-side
+CONTEXT_CACHE_REFRESH_MARGIN_SECONDS = 30
+# After a failed cache creation, send that instruction inline for this long before retrying
+CONTEXT_CACHE_FAILURE_BACKOFF_SECONDS = 300
+# Distinct system prompts tracked for context caching
+CONTEXT_CACHE_MAX_ENTRIES = 64
+
+# Vertex often streams in large bursts; re-slice these for a smooth typing feel
+SMOOTH_STREAM_MIN_CHUNK_CHARS = 50
+SMOOTH_STREAM_SLICE_CHARS = 4
+SMOOTH_STREAM_DELAY_SECONDS = 0.02
+
+# Coalescing for non-UI stream consumers (batch_tokens > 1)
+STREAM_BATCH_CHARS_PER_TOKEN = 4
+STREAM_BATCH_MAX_DELAY_SECONDS = 0.05
+STREAM_BATCH_GROWTH_FACTOR = 3
+
+# Responses are only reused for near-deterministic sampling
+RESPONSE_CACHE_MAX_TEMPERATURE = 0.3
+
+# Closing user turn when multi-turn history ends on a model message
+MULTI_TURN_CONTINUE_PROMPT = "Continue with the next response (ONLY ONE response, not multiple)."
+
+
+@lru_cache(maxsize=8)
+def _thinking_config(budget: int) -> types.ThinkingConfig:
+    """Shared ThinkingConfig per thinking budget."""
+    return types.ThinkingConfig(thinking_budget=budget)
+
+
+@lru_cache(maxsize=128)
+def _config_template(
+    temperature: float,
+    thinking_budget: Optional[int],
+    max_tokens: Optional[int],
+    json_response: bool
+) -> types.GenerateContentConfig:
+    """
+    Pre-validated GenerateContentConfig for a repeating settings combination.
+    
+    Per-request fields (system instruction, cache, schema) are layered on
+    with model_copy, so the safety/thinking validation runs once per combination.
+    """
+    config_params = {
+        'temperature': temperature,
+        'top_p': 0.95,
+        'safety_settings': GeminiChatProvider._SAFETY_SETTINGS,
+    }
+    if thinking_budget is not None:
+        config_params['thinking_config'] = _thinking_config(thinking_budget)
+    if max_tokens:
+        config_params['max_output_tokens'] = max_tokens
+    if json_response:
+        config_params['response_mime_type'] = 'application/json'
+    return types.GenerateContentConfig(**config_params)
+
 
 class GeminiChatProvider(ChatProvider):
     """Gemini implementation using Vertex AI (Google Cloud Platform).
@@ -21,13 +89,24 @@ class GeminiChatProvider(ChatProvider):
     - Workload Identity (for GKE/Cloud Run)
     """
     
+    # Request config constant shared by every call
+    _SAFETY_SETTINGS = [
+        types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
+        types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
+        types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
+        types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
+    ]
+    
     def __init__(
         self,
         project_id: Optional[str] = None,
         location: str = "us-central1",
         default_model_name: str = "gemini-2.5-flash",
         default_temperature: float = 1.0,
-        default_thinking_budget: int = -1
+        default_thinking_budget: int = -1,
+        response_cache: Optional[SemanticCache] = None,
+        native_multi_turn: bool = False,
+        canned_responses: Optional[Dict[str, str]] = None
     ):
         """
         Initialize Vertex AI client using Application Default Credentials.
@@ -38,6 +117,12 @@ class GeminiChatProvider(ChatProvider):
             default_model_name: Default model to use
             default_temperature: Default temperature
             default_thinking_budget: Default thinking budget
+            response_cache: Optional semantic cache for low-temperature responses
+            native_multi_turn: Opt in to sending history as multi-turn
+                contents; by default history uses the plain-text serialization
+            canned_responses: Optional map of trivial user inputs (matched
+                case-insensitively after stripping) to fixed replies returned
+                by generate_chat_response without an API call
         
         Authentication:
             Uses Application Default Credentials (ADC) in this order:
@@ -50,6 +135,13 @@ class GeminiChatProvider(ChatProvider):
         self.default_model_name = default_model_name
         self.default_temperature = default_temperature
         self.default_thinking_budget = default_thinking_budget
+        self.response_cache = response_cache
+        self.native_multi_turn = native_multi_turn
+        self.canned_responses = {
+            key.strip().lower(): reply for key, reply in (canned_responses or {}).items()
+        }
+        # count_tokens results keyed by (model, hash of serialized messages)
+        self._token_count_cache = TTLCache(maxsize=1024)
         
         # Determine authentication mode: Vertex AI (ADC) or API Key
         use_vertex = os.getenv("GOOGLE_GENAI_USE_VERTEXAI", "").lower() == "true"
@@ -62,9 +154,8 @@ class GeminiChatProvider(ChatProvider):
             # Ensure Vertex AI environment variable is set
             os.environ['GOOGLE_GENAI_USE_VERTEXAI'] = 'True'
             
-            from google.genai.types import HttpOptions
             self.client = genai.Client(
-                http_options=HttpOptions(api_version="v1")
+                http_options=pooled_http_options(api_version="v1")
             )
             logger.info(f"Initialized Vertex AI client with model: {default_model_name}, project: {self.project_id}, location: {self.location}")
         else:
@@ -73,52 +164,239 @@ class GeminiChatProvider(ChatProvider):
             if not api_key:
                 raise ValueError("GEMINI_API_KEY or GOOGLE_API_KEY environment variable is required for API key mode")
             
-            self.client = genai.Client(api_key=api_key)
+            self.client = genai.Client(api_key=api_key, http_options=pooled_http_options())
             logger.info(f"Initialized Google AI API with API key, model: {default_model_name}")
+        
+        # Explicit context caches for large system prompts: key -> (cache_name, expires_at);
+        # cache_name "" records a failed creation that isn't retried until expires_at
+        self._cache_registry = TTLCache(maxsize=CONTEXT_CACHE_MAX_ENTRIES)
+        # Keys seen once; a second request with the same prompt triggers caching
+        self._cache_seen = TTLCache(maxsize=CONTEXT_CACHE_MAX_ENTRIES * 4, ttl=CONTEXT_CACHE_TTL_SECONDS)
+        # Per-key locks so concurrent requests share one caches.create
+        self._cache_locks = TTLCache(maxsize=CONTEXT_CACHE_MAX_ENTRIES)
+    
+    async def _get_cached_content(self, model: str, system_inst: Optional[str]) -> Optional[str]:
+        """
+        Return an explicit context cache name holding system_inst, creating it if needed.
+        
+        Returns None (send the instruction inline) for small instructions,
+        the first request with a given instruction, and creation failures.
+        A cache is only created once the same instruction is seen twice, so
+        one-off prompts don't pay for a create round trip and cache storage.
+        Failures are remembered for CONTEXT_CACHE_FAILURE_BACKOFF_SECONDS,
+        and concurrent callers for the same key wait on a single creation.
+        """
+        if not system_inst or len(system_inst) < CONTEXT_CACHE_MIN_CHARS:
+            return None
+        
+        key = f"{model}:{hashlib.blake2b(system_inst.encode()).hexdigest()}"
+        entry = self._cache_registry.get(key)
+        if entry and entry[1] > time.monotonic():
+            return entry[0] or None
+        
+        if self._cache_seen.get(key) is None:
+            self._cache_seen.set(key, True)
+            return None
+        
+        lock = self._cache_locks.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._cache_locks.set(key, lock)
+        async with lock:
+            # Another request may have created (or failed to create) it while we waited
+            entry = self._cache_registry.get(key)
+            if entry and entry[1] > time.monotonic():
+                return entry[0] or None
+            
+            try:
+                cache = await self.client.aio.caches.create(
+                    model=model,
+                    config=types.CreateCachedContentConfig(
+                        system_instruction=system_inst,
+                        ttl=f"{CONTEXT_CACHE_TTL_SECONDS}s"
+                    )
+                )
+            except Exception as e:
+                logger.warning(f"Context cache creation failed, sending system instruction inline: {e}")
+                self._cache_registry.set(key, ("", time.monotonic() + CONTEXT_CACHE_FAILURE_BACKOFF_SECONDS))
+                return None
+            
+            expires_at = time.monotonic() + CONTEXT_CACHE_TTL_SECONDS - CONTEXT_CACHE_REFRESH_MARGIN_SECONDS
+            self._cache_registry.set(key, (cache.name, expires_at))
+            logger.info(f"Created context cache {cache.name} for model {model}")
+            return cache.name
+    
+    def _response_cache_namespace(
+        self,
+        messages: List[ChatMessage],
+        model: str,
+        temperature: float,
+        response_schema: Optional[Dict[str, Any]],
+        no_cache: bool
+    ) -> Optional[str]:
+        """
+        Namespace for the semantic response cache, or None if this call isn't cacheable.
+        
+        Everything except the final user message (model, settings, schema and
+        prior history) must match exactly; only the final message is compared
+        semantically. Calls with more than one system message are skipped:
+        the extra ones carry per-request context (e.g. the agent's
+        timestamped project snapshot), so they would never hit and the
+        query embedding would be wasted.
+        """
+        if (
+            self.response_cache is None
+            or no_cache
+            or temperature > RESPONSE_CACHE_MAX_TEMPERATURE
+            or messages[-1].role != "user"
+            or not messages[-1].content.strip()
+            or sum(msg.role == "system" for msg in messages) > 1
+        ):
+            return None
+        
+        digest = hashlib.blake2b()
+        digest.update(f"{model}\x00{temperature}\x00".encode())
+        if response_schema is not None:
+            digest.update(json.dumps(response_schema, sort_keys=True).encode())
+        for msg in messages[:-1]:
+            digest.update(f"\x00{msg.role}\x00{msg.content}".encode())
+        return digest.hexdigest()
     
     def _convert_messages(self, messages: List[ChatMessage]):
         """
         Convert ChatMessage list to Gemini format.
         
-        For agent workflows, conversation history is serialized as plain text
-        to bypass alternation requirements. This allows:
-        - Consecutive model messages (INFO → ACTION → tool result)
-        - Autonomous multi-step workflows
-        - Natural agent conversation patterns
+        By default, conversation history is sent as a single plain text user
+        block (see _serialize_history_as_text).
+        
+        With native_multi_turn enabled, history is sent as native multi-turn
+        contents. Roles map user -> "user" and assistant/tool -> "model";
+        consecutive messages with the same role are coalesced into one Content
+        (one Part per message) so agent workflows with back-to-back model turns
+        (INFO → ACTION → tool result) still satisfy role alternation.
         
         Returns:
             (system_instruction, contents)
         """
-        system_instruction = None
+        system_parts = []
         conversation_messages = []
         
         # Separate system messages from conversation
         for msg in messages:
             if msg.role == "system":
-                system_instruction = msg.content if not system_instruction else system_instruction + "\n\n" + msg.content
+                system_parts.append(msg.content)
             else:
                 conversation_messages.append(msg)
         
-        # Convert conversation to plain text format (bypasses role alternation)
-        if conversation_messages:
-            conversation_text = "=== CONVERSATION HISTORY ===\n\n"
-            
-            for msg in conversation_messages:
-                if msg.role == "user":
-                    conversation_text += f"USER: {msg.content}\n\n"
-                elif msg.role in ["assistant", "tool"]:
-                    conversation_text += f"AGENT: {msg.content}\n\n"
-            
-            conversation_text += "=== END HISTORY ===\n\nGenerate the next AGENT response (ONLY ONE response, not multiple):"
-            
-            # Return as single user message
-            contents = [types.Content(role="user", parts=[types.Part.from_text(text=conversation_text)])]
-        else:
+        system_instruction = "\n\n".join(system_parts) if system_parts else None
+        
+        if not conversation_messages:
             # No conversation yet - should not happen but handle gracefully
-            contents = []
+            return system_instruction, []
+        
+        if not self.native_multi_turn:
+            return system_instruction, self._serialize_history_as_text(conversation_messages)
+        
+        contents: List[types.Content] = []
+        for msg in conversation_messages:
+            if msg.role == "user":
+                role = "user"
+            elif msg.role in ["assistant", "tool"]:
+                role = "model"
+            else:
+                continue
+            
+            part = types.Part.from_text(text=msg.content)
+            if contents and contents[-1].role == role:
+                contents[-1].parts.append(part)
+            else:
+                contents.append(types.Content(role=role, parts=[part]))
+        
+        # Gemini expects the request to end on a user turn
+        if contents and contents[-1].role == "model":
+            contents.append(types.Content(
+                role="user",
+                parts=[types.Part.from_text(text=MULTI_TURN_CONTINUE_PROMPT)]
+            ))
         
         return system_instruction, contents
     
+    def _serialize_history_as_text(self, conversation_messages: List[ChatMessage]) -> List[types.Content]:
+        """Serialize history into one labelled user block (bypasses role alternation)."""
+        # One Part per message: earlier turns tokenize identically on every
+        # call, so the growing history stays a stable prefix for Gemini's
+        # implicit cache and only the tail and footer are new each turn
+        parts = [types.Part.from_text(text="=== CONVERSATION HISTORY ===\n\n")]
+        
+        for msg in conversation_messages:
+            if msg.role == "user":
+                parts.append(types.Part.from_text(text=f"USER: {msg.content}\n\n"))
+            elif msg.role in ["assistant", "tool"]:
+                parts.append(types.Part.from_text(text=f"AGENT: {msg.content}\n\n"))
+        
+        parts.append(types.Part.from_text(
+            text="=== END HISTORY ===\n\nGenerate the next AGENT response (ONLY ONE response, not multiple):"
+        ))
+        
+        # Return as single user message
+        return [types.Content(role="user", parts=parts)]
+    
+    async def _build_config(
+        self,
+        model: str,
+        temperature: float,
+        thinking_budget: Optional[int],
+        max_tokens: Optional[int],
+        messages: List[ChatMessage],
+        contents: List[types.Content],
+        response_schema: Optional[Dict[str, Any]] = None,
+        extra: Optional[Dict[str, Any]] = None
+    ) -> Tuple[types.GenerateContentConfig, List[types.Content]]:
+        """
+        Build the request config from the memoized template for these settings.
+        
+        Only the first system message is eligible for a context cache; later
+        system messages (e.g. the agent's timestamped project snapshot) change
+        on every request. When a cache is used, they are sent as a leading
+        user part instead, since Gemini rejects system_instruction alongside
+        cached_content.
+        
+        Caller kwargs (extra) go through full validation instead of the template.
+        
+        Returns:
+            (config, contents)
+        """
+        update: Dict[str, Any] = {}
+        system_parts = [msg.content for msg in messages if msg.role == "system"]
+        cached_content = None
+        if system_parts:
+            cached_content = await self._get_cached_content(model, system_parts[0])
+        if cached_content:
+            update['cached_content'] = cached_content
+            if len(system_parts) > 1:
+                contents = self._prepend_user_text(contents, "\n\n".join(system_parts[1:]))
+        elif system_parts:
+            update['system_instruction'] = "\n\n".join(system_parts)
+        if response_schema is not None:
+            update['response_schema'] = response_schema
+        
+        template = _config_template(temperature, thinking_budget, max_tokens, response_schema is not None)
+        if extra:
+            return types.GenerateContentConfig(**{
+                **template.model_dump(exclude_none=True),
+                **update,
+                **extra
+            }), contents
+        return (template.model_copy(update=update) if update else template), contents
+    
+    def _prepend_user_text(self, contents: List[types.Content], text: str) -> List[types.Content]:
+        """Return contents with text as the first part of the opening user turn."""
+        part = types.Part.from_text(text=text)
+        if contents and contents[0].role == "user":
+            first = types.Content(role="user", parts=[part, *contents[0].parts])
+            return [first, *contents[1:]]
+        return [types.Content(role="user", parts=[part]), *contents]
+    
     async def generate_chat_response(
         self,
         messages: List[ChatMessage],
@@ -131,33 +409,38 @@ class GeminiChatProvider(ChatProvider):
         if not messages:
             raise ValueError("Messages cannot be empty")
         
-        system_inst, contents = self._convert_messages(messages)
         model = model_name or self.default_model_name
+        last = messages[-1]
+        if last.role == "user" and last.content.strip():
+            canned = self.canned_responses.get(last.content.strip().lower())
+            if canned is not None:
+                return ChatResponse(
+                    content=canned,
+                    model=model,
+                    usage={'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+                    metadata={'canned': True}
+                )
+        
+        system_inst, contents = self._convert_messages(messages)
         temp = temperature if temperature is not None else self.default_temperature
         think = thinking_budget if thinking_budget is not None else self.default_thinking_budget
         
-        config_params = {
-            'temperature': temp,
-            'top_p': 0.95,
-            'safety_settings': [
-                types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
-            ],
-            'thinking_config': types.ThinkingConfig(thinking_budget=think),
-            **kwargs
-        }
+        cache_namespace = self._response_cache_namespace(
+            messages, model, temp, None, kwargs.pop('no_cache', False)
+        )
+        if cache_namespace:
+            query_vector = await self.response_cache.embed(messages[-1].content.strip())
+            cached = self.response_cache.lookup(cache_namespace, query_vector)
+            if cached is not None:
+                # Hits share one stored object; callers get their own copy
+                return copy.deepcopy(cached)
         
-        if max_tokens:
-            config_params['max_output_tokens'] = max_tokens
-        if system_inst:
-            config_params['system_instruction'] = system_inst
+        config, contents = await self._build_config(model, temp, think, max_tokens, messages, contents, extra=kwargs)
         
-        response = self.client.models.generate_content(
+        response = await self.client.aio.models.generate_content(
             model=model,
             contents=contents,
-            config=types.GenerateContentConfig(**config_params)
+            config=config
         )
         
         usage = None
@@ -168,12 +451,17 @@ class GeminiChatProvider(ChatProvider):
                 'total_tokens': getattr(response.usage_metadata, 'total_token_count', 0)
             }
         
-        return ChatResponse(
+        chat_response = ChatResponse(
             content=response.text,
             model=model,
             usage=usage,
             metadata={'system_instruction': system_inst}
         )
+        
+        if cache_namespace:
+            self.response_cache.store(cache_namespace, query_vector, chat_response)
+        
+        return chat_response
     
     async def stream_chat_response(
         self,
@@ -182,42 +470,116 @@ class GeminiChatProvider(ChatProvider):
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
         thinking_budget: Optional[int] = None,
+        smooth_streaming: bool = False,
+        batch_tokens: int = 1,
         **kwargs
     ) -> AsyncIterator[str]:
+        """
+        Stream response text.
+        
+        Chunks are passed through as Vertex sends them. Opt in to
+        smooth_streaming to re-emit oversized chunks as small throttled
+        slices, so UIs see steady typing instead of long pauses; this adds
+        delay to the total stream time.
+        
+        batch_tokens > 1 is for server-side consumers: chunks are coalesced
+        into batches of up to ~batch_tokens tokens (flushed at least every
+        50ms), starting small for a fast first yield. Smoothing is skipped.
+        """
         if not messages:
             raise ValueError("Messages cannot be empty")
         
-        system_inst, contents = self._convert_messages(messages)
+        kwargs.pop('no_cache', None)  # streaming is never cached
+        _, contents = self._convert_messages(messages)
         model = model_name or self.default_model_name
         temp = temperature if temperature is not None else self.default_temperature
         think = thinking_budget if thinking_budget is not None else self.default_thinking_budget
         
-        config_params = {
-            'temperature': temp,
-            'top_p': 0.95,
-            'safety_settings': [
-                types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
-            ],
-            'thinking_config': types.ThinkingConfig(thinking_budget=think),
-            **kwargs
-        }
+        config, contents = await self._build_config(model, temp, think, max_tokens, messages, contents, extra=kwargs)
         
-        if max_tokens:
-            config_params['max_output_tokens'] = max_tokens
-        if system_inst:
-            config_params['system_instruction'] = system_inst
+        stream = self._stream_text(
+            await self.client.aio.models.generate_content_stream(
+                model=model,
+                contents=contents,
+                config=config
+            )
+        )
         
-        for chunk in self.client.models.generate_content_stream(
-            model=model,
-            contents=contents,
-            config=types.GenerateContentConfig(**config_params)
-        ):
+        if batch_tokens > 1:
+            async for batch in self._coalesce_chunks(stream, batch_tokens):
+                yield batch
+            return
+        
+        async for text in stream:
+            if smooth_streaming and len(text) > SMOOTH_STREAM_MIN_CHUNK_CHARS:
+                for i in range(0, len(text), SMOOTH_STREAM_SLICE_CHARS):
+                    yield text[i:i + SMOOTH_STREAM_SLICE_CHARS]
+                    await asyncio.sleep(SMOOTH_STREAM_DELAY_SECONDS)
+            else:
+                yield text
+    
+    async def _stream_text(self, response_stream) -> AsyncIterator[str]:
+        """Yield the non-empty text of each streamed chunk."""
+        async for chunk in response_stream:
             if hasattr(chunk, 'text') and chunk.text:
                 yield chunk.text
     
+    async def _coalesce_chunks(self, stream: AsyncIterator[str], batch_tokens: int) -> AsyncIterator[str]:
+        """
+        Merge stream chunks into growing batches.
+        
+        Batch size starts at one token and grows by STREAM_BATCH_GROWTH_FACTOR
+        per yield up to batch_tokens; a partial batch is flushed once it has
+        waited STREAM_BATCH_MAX_DELAY_SECONDS.
+        """
+        loop = asyncio.get_running_loop()
+        chunk_queue: asyncio.Queue = asyncio.Queue()
+        end_of_stream = object()
+        
+        async def _pump():
+            try:
+                async for text in stream:
+                    await chunk_queue.put(text)
+                await chunk_queue.put(end_of_stream)
+            except Exception as e:
+                await chunk_queue.put(e)
+        
+        pump_task = asyncio.create_task(_pump())
+        buffer: List[str] = []
+        buffered_chars = 0
+        target_tokens = 1
+        deadline = 0.0
+        
+        try:
+            while True:
+                timeout = max(0.0, deadline - loop.time()) if buffer else None
+                try:
+                    item = await asyncio.wait_for(chunk_queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    item = None  # flush timer fired
+                
+                if item is end_of_stream:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                
+                if item is not None:
+                    if not buffer:
+                        deadline = loop.time() + STREAM_BATCH_MAX_DELAY_SECONDS
+                    buffer.append(item)
+                    buffered_chars += len(item)
+                
+                if buffer and (item is None or buffered_chars >= target_tokens * STREAM_BATCH_CHARS_PER_TOKEN):
+                    yield "".join(buffer)
+                    buffer.clear()
+                    buffered_chars = 0
+                    target_tokens = min(target_tokens * STREAM_BATCH_GROWTH_FACTOR, batch_tokens)
+            
+            if buffer:
+                yield "".join(buffer)
+        finally:
+            pump_task.cancel()
+    
     async def generate_chat_response_with_schema(
         self,
         messages: List[ChatMessage],
@@ -230,43 +592,80 @@ class GeminiChatProvider(ChatProvider):
         if not messages or not response_schema:
             raise ValueError("Messages and schema required")
         
-        system_inst, contents = self._convert_messages(messages)
+        _, contents = self._convert_messages(messages)
         model = model_name or self.default_model_name
         temp = temperature if temperature is not None else self.default_temperature
         think = thinking_budget if thinking_budget is not None else self.default_thinking_budget
         
-        config_params = {
-            'temperature': temp,
-            'top_p': 0.95,
-            'response_mime_type': 'application/json',
-            'response_schema': response_schema,
-            'safety_settings': [
-                types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF"),
-            ],
-            **kwargs
-        }
+        cache_namespace = self._response_cache_namespace(
+            messages, model, temp, response_schema, kwargs.pop('no_cache', False)
+        )
+        if cache_namespace:
+            query_vector = await self.response_cache.embed(messages[-1].content.strip())
+            cached = self.response_cache.lookup(cache_namespace, query_vector)
+            if cached is not None:
+                return loads_json(cached)
         
         # Only add thinking_config if model supports it (thinking models)
         # Standard models like gemini-2.0-flash-exp don't support thinking mode
-        if think > 0 and 'thinking' in model.lower():
-            config_params['thinking_config'] = types.ThinkingConfig(thinking_budget=think)
+        schema_think = think if think > 0 and 'thinking' in model.lower() else None
         
-        if system_inst:
-            config_params['system_instruction'] = system_inst
+        config, contents = await self._build_config(
+            model, temp, schema_think, None, messages, contents,
+            response_schema=response_schema, extra=kwargs
+        )
         
-        response = self.client.models.generate_content(
+        response = await self.client.aio.models.generate_content(
             model=model,
             contents=contents,
-            config=types.GenerateContentConfig(**config_params)
+            config=config
         )
         
-        return json.loads(response.text)
+        result = loads_json(response.text)
+        
+        if cache_namespace:
+            # Cache the raw text so every hit returns a fresh, unshared dict
+            self.response_cache.store(cache_namespace, query_vector, response.text)
+        
+        return result
+    
+    async def warm_up(self) -> None:
+        """Open the pooled connection (TLS + auth token) with a cheap model lookup."""
+        await self.client.aio.models.get(model=self.default_model_name)
     
     async def count_tokens(self, messages: List[ChatMessage], model_name: Optional[str] = None, **kwargs) -> int:
+        """
+        Count tokens with the model's count_tokens endpoint.
+        
+        Results are cached per model and message content. Falls back to a
+        ~4 chars/token estimate if the API call fails.
+        """
         if not messages:
             raise ValueError("Messages cannot be empty")
-        text = "\n".join([f"{m.role}: {m.content}" for m in messages])
-        return len(text) // 4  # Rough estimate
+        
+        model = model_name or self.default_model_name
+        system_inst, contents = self._convert_messages(messages)
+        
+        digest = hashlib.blake2b()
+        for msg in messages:
+            digest.update(f"\x00{msg.role}\x00{msg.content}".encode())
+        cache_key = (model, digest.hexdigest())
+        cached = self._token_count_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        if system_inst:
+            # Count the system instruction as content; the Gemini API count endpoint
+            # doesn't accept system_instruction in API-key mode
+            contents = [types.Content(role="user", parts=[types.Part.from_text(text=system_inst)]), *contents]
+        
+        try:
+            response = await self.client.aio.models.count_tokens(model=model, contents=contents)
+            total = response.total_tokens or 0
+        except Exception as e:
+            logger.warning(f"count_tokens API failed, using estimate: {e}")
+            text = "\n".join([f"{m.role}: {m.content}" for m in messages])
+            return len(text) // 4  # Rough estimate
+        
+        self._token_count_cache.set(cache_key, total)
+        return total
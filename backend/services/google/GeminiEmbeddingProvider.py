@@ -1,19 +1,47 @@
 """Google Text Embedding Provider using Vertex AI."""
 
+import asyncio
+import hashlib
+import itertools
 import logging
 import os
-from typing import List, Optional
+import random
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
 from google import genai
-from google.genai import types
+from google.genai import errors, types
+
+from services.google.genai_http import pooled_http_options
+from utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Rate-limit / transient statuses worth retrying
+RETRYABLE_STATUS_CODES = {429, 500, 503}
+EMBED_MAX_RETRIES = 4
+EMBED_RETRY_BASE_DELAY = 0.5
+# Max texts per embed_content request
+EMBED_BATCH_SIZE = 250
+# Output size of text-embedding-004
+DEFAULT_EMBEDDING_DIM = 768
+
+
+def _l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale vectors (last axis) to unit length; all-zero vectors stay zero."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / (norms + 1e-12)
+
 
 class GeminiEmbeddingProvider:
     """
     Google Text Embedding Provider using text-embedding-004.
     
     Supports both single and batch embedding generation for RAG systems.
+    Vectors are L2-normalized, so cosine similarity is a plain dot product
+    (e.g. scores = corpus_matrix @ query).
     Authentication uses Application Default Credentials (ADC).
     """
     
@@ -21,7 +49,11 @@ class GeminiEmbeddingProvider:
         self,
         project_id: Optional[str] = None,
         location: str = "us-central1",
-        model_name: str = "text-embedding-004"
+        model_name: str = "text-embedding-004",
+        max_concurrency: int = 16,
+        cache_size: int = 4096,
+        cache_path: Optional[str] = None,
+        embedding_dim: int = DEFAULT_EMBEDDING_DIM
     ):
         """
         Initialize embedding provider.
@@ -30,6 +62,11 @@ class GeminiEmbeddingProvider:
             project_id: Google Cloud project ID (optional, will use from ADC if not provided)
             location: GCP region (default: us-central1)
             model_name: Embedding model to use (default: text-embedding-004)
+            max_concurrency: Max in-flight requests in embed_batch
+            cache_size: Max embed_single results kept in memory
+            cache_path: Optional SQLite file persisting embed_single results across restarts
+            embedding_dim: Output size of model_name (length of the zero vector
+                returned for blank input)
         
         Authentication:
             Uses Application Default Credentials (ADC) in this order:
@@ -40,6 +77,19 @@ class GeminiEmbeddingProvider:
         self.project_id = project_id or os.getenv('GOOGLE_CLOUD_PROJECT')
         self.location = location
         self.model_name = model_name
+        self.max_concurrency = max_concurrency
+        self.embedding_dim = embedding_dim
+        
+        # embed_single cache keyed by SHA-256 of the text (model is fixed per instance)
+        self._embedding_cache = TTLCache(maxsize=cache_size)
+        self._cache_db: Optional[sqlite3.Connection] = None
+        self._cache_db_lock = threading.Lock()
+        if cache_path:
+            self._cache_db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._cache_db.execute(
+                "CREATE TABLE IF NOT EXISTS emb_cache (hash TEXT PRIMARY KEY, vec BLOB)"
+            )
+            self._cache_db.commit()
         
         # Determine authentication mode: Vertex AI (ADC) or API Key
         # Only use Vertex if explicitly enabled via GOOGLE_GENAI_USE_VERTEXAI=true
@@ -55,20 +105,23 @@ class GeminiEmbeddingProvider:
             # Ensure Vertex AI environment variable is set
             os.environ['GOOGLE_GENAI_USE_VERTEXAI'] = 'True'
             
-            from google.genai.types import HttpOptions
             self.client = genai.Client(
-                http_options=HttpOptions(api_version="v1")
+                http_options=pooled_http_options(api_version="v1")
             )
             logger.info(f"Initialized Vertex AI embedding client: {model_name}, project: {self.project_id}")
         elif api_key:
             # Use Google AI API with API key (default)
             logger.info("Using Google AI API with API key")
-            self.client = genai.Client(api_key=api_key)
+            self.client = genai.Client(api_key=api_key, http_options=pooled_http_options())
             logger.info(f"Initialized Google AI API embedding client: {model_name}")
         else:
             raise ValueError("Either GEMINI_API_KEY or (GOOGLE_GENAI_USE_VERTEXAI=true + GOOGLE_CLOUD_PROJECT) is required")
     
-    def embed_single(self, text: str) -> List[float]:
+    async def warm_up(self) -> None:
+        """Open the pooled connection (TLS + auth token) with a cheap model lookup."""
+        await self.client.aio.models.get(model=self.model_name)
+    
+    def embed_single(self, text: str) -> np.ndarray:
         """
         Generate embedding for a single text (for runtime query embedding).
         
@@ -76,47 +129,138 @@ class GeminiEmbeddingProvider:
             text: Text to embed
             
         Returns:
-            List of float values representing the embedding vector
+            Unit-length float32 embedding vector (all zeros for blank text)
         """
+        if not text or not text.strip():
+            # Nothing to embed; a zero vector scores 0 against every corpus row
+            return np.zeros(self.embedding_dim, dtype=np.float32)
+        
+        key = hashlib.sha256(f"{self.model_name}\x00{text}".encode()).hexdigest()
+        cached = self._get_cached_embedding(key)
+        if cached is not None:
+            return cached
+        
         try:
             response = self.client.models.embed_content(
                 model=self.model_name,
                 contents=text
             )
-            
-            # Extract embedding vector
-            if hasattr(response, 'embeddings') and len(response.embeddings) > 0:
-                embedding = response.embeddings[0]
-                if hasattr(embedding, 'values'):
-                    return list(embedding.values)
-            
-            raise ValueError("No embedding returned from API")
+            embedding = _l2_normalize(np.asarray(self._extract_embedding(response), dtype=np.float32))
             
         except Exception as e:
             logger.error(f"Error embedding single text: {e}")
             raise
+        
+        self._store_cached_embedding(key, embedding)
+        return embedding
+    
+    def _get_cached_embedding(self, key: str) -> Optional[np.ndarray]:
+        """Look up an embedding in memory, then in the persistent cache if configured."""
+        embedding = self._embedding_cache.get(key)
+        if embedding is not None or self._cache_db is None:
+            return embedding
+        
+        with self._cache_db_lock:
+            row = self._cache_db.execute("SELECT vec FROM emb_cache WHERE hash = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        
+        embedding = np.frombuffer(row[0], dtype=np.float32).copy()
+        self._embedding_cache.set(key, embedding)
+        return embedding
     
-    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+    def _store_cached_embedding(self, key: str, embedding: np.ndarray) -> None:
+        self._embedding_cache.set(key, embedding)
+        if self._cache_db is None:
+            return
+        
+        with self._cache_db_lock:
+            self._cache_db.execute(
+                "INSERT OR REPLACE INTO emb_cache (hash, vec) VALUES (?, ?)",
+                (key, embedding.tobytes())
+            )
+            self._cache_db.commit()
+    
+    def _extract_embedding(self, response) -> List[float]:
+        """Pull the first embedding vector out of an embed_content response."""
+        if hasattr(response, 'embeddings') and len(response.embeddings) > 0:
+            embedding = response.embeddings[0]
+            if hasattr(embedding, 'values'):
+                return list(embedding.values)
+        
+        raise ValueError("No embedding returned from API")
+    
+    async def _embed_with_retry(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in one async request, backing off on rate limits and transient errors."""
+        for attempt in range(EMBED_MAX_RETRIES + 1):
+            try:
+                response = await self.client.aio.models.embed_content(
+                    model=self.model_name,
+                    contents=texts
+                )
+                vectors = [embedding.values for embedding in (response.embeddings or [])]
+                if len(vectors) != len(texts):
+                    raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+                return _l2_normalize(np.asarray(vectors, dtype=np.float32))
+            except errors.APIError as e:
+                if e.code not in RETRYABLE_STATUS_CODES or attempt == EMBED_MAX_RETRIES:
+                    raise
+                delay = EMBED_RETRY_BASE_DELAY * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay))
+    
+    async def embed_batch(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
         """
         Generate embeddings for multiple texts (for corpus building).
         
+        Texts are sent EMBED_BATCH_SIZE per request, with up to max_concurrency
+        requests in flight. If a whole batch fails, its texts are retried
+        one at a time so a single bad input doesn't sink its neighbours.
+        
         Args:
             texts: List of texts to embed
             
         Returns:
-            List of embedding vectors (each is a list of floats)
+            (embeddings, valid_mask): float32 array of shape (len(texts), dim)
+            with unit-length rows, and a bool array marking rows that were
+            embedded successfully. Rows where valid_mask is False are zero.
         """
-        embeddings = []
+        valid_mask = np.zeros(len(texts), dtype=bool)
+        matrix: Optional[np.ndarray] = None
+        semaphore = asyncio.Semaphore(self.max_concurrency)
         
-        # Process one at a time to avoid rate limits and handle errors gracefully
-        for i, text in enumerate(texts):
-            try:
-                logger.info(f"Embedding text {i+1}/{len(texts)}")
-                embedding = self.embed_single(text)
-                embeddings.append(embedding)
-            except Exception as e:
-                logger.error(f"Error embedding text {i+1}: {e}")
-                # Append None to maintain index alignment
-                embeddings.append(None)
-        
-        return embeddings
+        def _fill(start: int, rows: np.ndarray):
+            nonlocal matrix
+            if matrix is None:
+                # Allocate once the embedding dimension is known
+                matrix = np.zeros((len(texts), rows.shape[1]), dtype=np.float32)
+            matrix[start:start + len(rows)] = rows
+            valid_mask[start:start + len(rows)] = True
+        
+        async def _embed_at(i: int, text: str):
+            async with semaphore:
+                try:
+                    _fill(i, await self._embed_with_retry([text]))
+                except Exception as e:
+                    # Leave the row invalid to maintain index alignment
+                    logger.error(f"Error embedding text {i+1}: {e}")
+        
+        async def _embed_chunk(start: int, chunk: tuple):
+            async with semaphore:
+                try:
+                    _fill(start, await self._embed_with_retry(list(chunk)))
+                    return
+                except Exception as e:
+                    logger.warning(f"Batch embedding failed for texts {start+1}-{start+len(chunk)}, retrying individually: {e}")
+            
+            await asyncio.gather(*(_embed_at(start + j, text) for j, text in enumerate(chunk)))
+        
+        chunks = list(itertools.batched(texts, EMBED_BATCH_SIZE))
+        logger.info(f"Embedding {len(texts)} texts in {len(chunks)} requests (max_concurrency={self.max_concurrency})")
+        await asyncio.gather(*(
+            _embed_chunk(n * EMBED_BATCH_SIZE, chunk) for n, chunk in enumerate(chunks)
+        ))
+        
+        if matrix is None:
+            matrix = np.zeros((len(texts), 0), dtype=np.float32)
+        
+        return matrix, valid_mask
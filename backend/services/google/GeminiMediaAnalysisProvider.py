@@ -18,17 +18,171 @@ Authentication is handled via Application Default Credentials (ADC):
 import os
 import logging
 import asyncio
-from typing import Optional, Dict, Any
+import hashlib
+import json
+import mimetypes
+import random
+import re
+import time
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional, Dict, Any, List
 from urllib.parse import urlparse
+import httpx
 from google import genai
-from google.genai.types import HttpOptions, Part, GenerationConfig
+from google.genai import errors
+from google.genai.types import Part, GenerationConfig
 
 from ..base.MediaAnalysisProvider import MediaAnalysisProvider, MediaAnalysisResult
+from services.google.genai_http import pooled_http_options
+from utils.cache import TTLCache
+from utils.json_utils import loads_json
+from utils.rate_limit import RateLimiter
 
 logger = logging.getLogger(__name__)
 
 # System instruction for laconic, direct responses
 ANALYSIS_SYSTEM_INSTRUCTION = """Answer directly and comprehensively with no extra language. Be laconic - minimal words, all requested details. Skip introductions, conclusions, and conversational phrases. Essential information only."""
+# Fixed separator between the media and the per-call question: everything up to
+# and including it is identical across questions, so implicit caching can reuse it
+QUESTION_HEADER = "Question about the media above:"
+
+# Rate-limit / transient statuses worth retrying
+RETRYABLE_STATUS_CODES = {429, 500, 503, 504}
+ANALYSIS_MAX_ATTEMPTS = 3
+ANALYSIS_RETRY_BASE_DELAY = 1.0
+ANALYSIS_RETRY_MAX_DELAY = 60.0
+# Fail fast for this long once the daily quota is exhausted
+QUOTA_BREAKER_SECONDS = 3600
+# While the breaker is open, log only every Nth fast-failed analysis
+BREAKER_LOG_SAMPLE_RATE = 50
+# A pooled client that hits a rate limit sits out this long (unless Retry-After says otherwise)
+POOL_CLIENT_COOLDOWN_SECONDS = 60
+# Successful analyses reused for repeat questions about the same file
+RESULT_CACHE_SIZE = 1024
+RESULT_CACHE_TTL_SECONDS = 3600
+# Explicit context caches for audio/video asked about more than once
+FILE_CACHE_TTL_SECONDS = 3600
+# Stop reusing a cache this long before it expires server-side
+FILE_CACHE_REFRESH_MARGIN_SECONDS = 60
+FILE_CACHE_MAX_ENTRIES = 256
+# Batch prediction jobs: polling backs off from the initial to the max interval
+BATCH_POLL_INITIAL_SECONDS = 15
+BATCH_POLL_MAX_SECONDS = 300
+BATCH_TIMEOUT_SECONDS = 24 * 3600
+# Content-Type lookups for extensionless URLs (GCS metadata / HTTP HEAD)
+CONTENT_TYPE_LOOKUP_TIMEOUT_SECONDS = 5.0
+
+
+# Map extensions to MIME types
+_MIME_TYPES = MappingProxyType({
+    # Videos
+    'mp4': 'video/mp4',
+    'mov': 'video/quicktime',
+    'avi': 'video/x-msvideo',
+    'flv': 'video/x-flv',
+    'mpg': 'video/mpeg',
+    'mpeg': 'video/mpeg',
+    'webm': 'video/webm',
+    'wmv': 'video/x-ms-wmv',
+    '3gp': 'video/3gpp',
+
+    # Images
+    'jpg': 'image/jpeg',
+    'jpeg': 'image/jpeg',
+    'png': 'image/png',
+    'gif': 'image/gif',
+    'webp': 'image/webp',
+    'bmp': 'image/bmp',
+    'heic': 'image/heic',
+    'heif': 'image/heif',
+
+    # Audio
+    'mp3': 'audio/mpeg',
+    'wav': 'audio/wav',
+    'aac': 'audio/aac',
+    'ogg': 'audio/ogg',
+    'flac': 'audio/flac',
+    'aiff': 'audio/aiff',
+
+    # Documents
+    'pdf': 'application/pdf',
+    'txt': 'text/plain',
+    'html': 'text/html',
+    'json': 'application/json',
+})
+
+
+@lru_cache(maxsize=4096)
+def _mime_for_url(file_url: str) -> Optional[str]:
+    """MIME type for the URL's extension (query string ignored), or None if unknown."""
+    path = urlparse(file_url).path
+    ext = os.path.splitext(path)[1][1:].lower()
+    if not ext:
+        return None
+    # Extensions outside our table (m4a, mkv, ...) fall back to the stdlib registry
+    return _MIME_TYPES.get(ext) or mimetypes.guess_type(path)[0]
+
+
+# https://storage.googleapis.com/<bucket>/<object> or https://<bucket>.storage.googleapis.com/<object>
+_GCS_HTTPS_RE = re.compile(
+    r"^https?://(?:storage\.googleapis\.com/(?P<b1>[^/?#]+)/(?P<o1>[^?#]+)"
+    r"|(?P<b2>[^/?#]+)\.storage\.googleapis\.com/(?P<o2>[^?#]+))",
+    re.IGNORECASE
+)
+
+
+@lru_cache(maxsize=2048)
+def _normalize_gcs_url(url: str) -> str:
+    """gs:// URI for a GCS HTTPS (e.g. signed) URL; any other URL is returned unchanged."""
+    match = _GCS_HTTPS_RE.match(url)
+    if not match:
+        return url
+    if match.group('b1'):
+        return f"gs://{match.group('b1')}/{match.group('o1')}"
+    return f"gs://{match.group('b2').lower()}/{match.group('o2')}"
+
+
+_YOUTUBE_HOSTS = frozenset({"youtube.com", "www.youtube.com", "m.youtube.com", "youtu.be"})
+# Schemes Part.from_uri can reference directly
+_URI_SCHEMES = frozenset({"gs", "http", "https"})
+
+
+@lru_cache(maxsize=2048)
+def _url_kind(url: str) -> Optional[str]:
+    """Classify a media URL with one parse: "youtube", "uri" (GCS/HTTP) or None (unsupported)."""
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    if scheme not in _URI_SCHEMES:
+        return None
+    if scheme != "gs" and parsed.netloc.lower() in _YOUTUBE_HOSTS:
+        return "youtube"
+    return "uri"
+
+
+def _is_daily_quota_error(error: errors.APIError) -> bool:
+    """Whether a 429 is daily quota exhaustion (retrying won't help) rather than a burst limit."""
+    message = str(error).lower()
+    return error.code == 429 and ("per day" in message or "perday" in message)
+
+
+def _retry_after_seconds(error: errors.APIError, default: float) -> float:
+    """Retry-After header of a failed response in seconds, or default."""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        return float(headers.get('retry-after', default))
+    except (TypeError, ValueError):
+        return default
+
+
+@dataclass
+class _ClientSlot:
+    """One credential's client in the rotation, with its own RPM budget."""
+    client: Any
+    rate_limiter: RateLimiter
+    label: str
+    cooldown_until: float = 0.0
 
 
 class GeminiMediaAnalysisProvider(MediaAnalysisProvider):
@@ -63,7 +217,10 @@ class GeminiMediaAnalysisProvider(MediaAnalysisProvider):
         self,
         project_id: Optional[str] = None,
         location: str = "us-central1",
-        default_model: str = "gemini-2.0-flash-exp"
+        default_model: str = "gemini-2.0-flash-exp",
+        max_concurrency: Optional[int] = None,
+        requests_per_minute: Optional[int] = None,
+        credentials_pool: Optional[List[str]] = None
     ):
         """
         Initialize Gemini media analysis provider using Vertex AI.
@@ -72,6 +229,15 @@ class GeminiMediaAnalysisProvider(MediaAnalysisProvider):
             project_id: GCP project ID (optional, uses GOOGLE_CLOUD_PROJECT env var if not provided)
             location: GCP region (default: us-central1)
             default_model: Default model to use for analysis
+            max_concurrency: Max in-flight Gemini requests
+                (default: VERTEX_MAX_CONCURRENCY env var or 8)
+            requests_per_minute: Request rate cap per credential
+                (default: VERTEX_MAX_RPM env var or 200)
+            credentials_pool: Optional service account JSON paths rotated
+                round-robin per request, each with its own RPM budget
+                (default: comma-separated VERTEX_CREDENTIALS_POOL env var).
+                Vertex quotas are per project, so this only raises the
+                ceiling when the accounts belong to different projects.
         
         Environment Variables Required:
             - GOOGLE_CLOUD_PROJECT: Your GCP project ID
@@ -83,6 +249,28 @@ class GeminiMediaAnalysisProvider(MediaAnalysisProvider):
         self.location = location or os.getenv('GOOGLE_CLOUD_LOCATION', 'us-central1')
         self.default_model = default_model
         
+        # Shared limits so concurrent analyses don't stampede the project quota
+        self._semaphore = asyncio.Semaphore(
+            max_concurrency or int(os.getenv("VERTEX_MAX_CONCURRENCY", "8"))
+        )
+        rpm = requests_per_minute or int(os.getenv("VERTEX_MAX_RPM", "200"))
+        # Monotonic deadline while the daily-quota circuit breaker is open
+        self._breaker_open_until = 0.0
+        self._breaker_error_count = 0
+        # Successful results keyed by hash of (url, question, model, temperature, audio_timestamp)
+        self._result_cache = TTLCache(maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL_SECONDS)
+        # "model|url" -> context cache name ("" = caching not possible for this file)
+        self._file_caches = TTLCache(
+            maxsize=FILE_CACHE_MAX_ENTRIES,
+            ttl=FILE_CACHE_TTL_SECONDS - FILE_CACHE_REFRESH_MARGIN_SECONDS
+        )
+        # "model|url" keys analyzed once; a second question triggers caching
+        self._files_seen = TTLCache(maxsize=FILE_CACHE_MAX_ENTRIES * 4, ttl=FILE_CACHE_TTL_SECONDS)
+        # Looked-up Content-Types for URLs without a usable extension
+        self._content_types = TTLCache(maxsize=2048)
+        # google.cloud.storage client, created on first GCS metadata/batch access
+        self._storage_client = None
+        
         # Ensure Vertex AI mode is enabled
         if os.getenv('GOOGLE_GENAI_USE_VERTEXAI') != 'True':
             logger.warning("GOOGLE_GENAI_USE_VERTEXAI not set to 'True'. Setting it now.")
@@ -97,14 +285,58 @@ class GeminiMediaAnalysisProvider(MediaAnalysisProvider):
         # Initialize Vertex AI client with v1 API (per official docs)
         # Uses Application Default Credentials automatically
         self.client = genai.Client(
-            http_options=HttpOptions(api_version="v1")
+            http_options=pooled_http_options(api_version="v1")
         )
         
+        # Rotation of (client, RPM bucket) slots; the ADC client is always first
+        # and is the one used for context caches and batch jobs
+        self._slots = [_ClientSlot(client=self.client, rate_limiter=RateLimiter(rpm), label="adc")]
+        if credentials_pool is None:
+            credentials_pool = [p.strip() for p in os.getenv("VERTEX_CREDENTIALS_POOL", "").split(",") if p.strip()]
+        for path in credentials_pool:
+            self._slots.append(_ClientSlot(
+                client=self._client_for_service_account(path),
+                rate_limiter=RateLimiter(rpm),
+                label=os.path.basename(path)
+            ))
+        self._next_slot = 0
+        
         logger.info(
             f"Initialized Vertex AI Media Analysis: "
-            f"model={default_model}, project={self.project_id}, location={self.location}"
+            f"model={default_model}, project={self.project_id}, location={self.location}, "
+            f"clients={len(self._slots)}"
+        )
+    
+    def _client_for_service_account(self, credentials_path: str) -> genai.Client:
+        """Vertex AI client authenticated as a specific service account (its own project if set)."""
+        from google.oauth2 import service_account
+        
+        credentials = service_account.Credentials.from_service_account_file(
+            credentials_path,
+            scopes=["https://www.googleapis.com/auth/cloud-platform"]
+        )
+        return genai.Client(
+            vertexai=True,
+            project=credentials.project_id or self.project_id,
+            location=self.location,
+            credentials=credentials,
+            http_options=pooled_http_options(api_version="v1")
         )
     
+    def _pick_slot(self, pinned: bool) -> _ClientSlot:
+        """Next client in round-robin order that isn't cooling down (primary when pinned)."""
+        if pinned or len(self._slots) == 1:
+            return self._slots[0]
+        
+        now = time.monotonic()
+        for _ in range(len(self._slots)):
+            slot = self._slots[self._next_slot % len(self._slots)]
+            self._next_slot += 1
+            if slot.cooldown_until <= now:
+                return slot
+        # Everyone is cooling down: use whichever recovers first
+        return min(self._slots, key=lambda slot: slot.cooldown_until)
+    
     async def analyze_media(
         self,
         file_url: str,
@@ -112,6 +344,7 @@ class GeminiMediaAnalysisProvider(MediaAnalysisProvider):
         model_name: Optional[str] = None,
         temperature: float = 0.1,
         audio_timestamp: bool = False,
+        response_schema: Optional[Any] = None,
         **kwargs
     ) -> MediaAnalysisResult:
         """
@@ -129,6 +362,9 @@ class GeminiMediaAnalysisProvider(MediaAnalysisProvider):
             audio_timestamp: Enable accurate timestamps for audio-only files (default: False)
                             For videos, timestamps are included automatically.
                             For audio-only, set to True for accurate timestamp generation.
+            response_schema: Optional JSON schema dict or Pydantic model class. The
+                            model then returns JSON matching it, parsed into
+                            metadata['structured'] (analysis keeps the raw JSON text).
             **kwargs: Additional parameters (max_tokens, etc.)
         
         Returns:
@@ -165,19 +401,42 @@ class GeminiMediaAnalysisProvider(MediaAnalysisProvider):
             logger.debug(f"Question: {question}")
             logger.debug(f"Model: {model}, Temperature: {temperature}")
 
+            schema_key = ""
+            structured_params: Dict[str, Any] = {}
+            if response_schema is not None:
+                schema_dict = (
+                    response_schema.model_json_schema()
+                    if hasattr(response_schema, 'model_json_schema') else response_schema
+                )
+                schema_key = json.dumps(schema_dict, sort_keys=True)
+                structured_params = {
+                    'response_mime_type': "application/json",
+                    'response_schema': response_schema
+                }
+            
+            cache_key = hashlib.sha256(
+                f"{normalized_url}|{question}|{model}|{temperature}|{audio_timestamp}|{schema_key}".encode()
+            ).hexdigest()
+            cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                logger.info("Returning cached analysis result")
+                return replace(
+                    cached,
+                    file_url=file_url,
+                    metadata={**(cached.metadata or {}), 'cache_hit': True}
+                )
+
             # Check if it's a YouTube URL (special handling)
-            is_youtube = 'youtube.com/watch' in normalized_url or 'youtu.be/' in normalized_url
+            url_kind = _url_kind(normalized_url)
 
-            if is_youtube:
+            if url_kind == "youtube":
                 # YouTube URLs: Use FileData pattern with video/mp4 MIME type
                 # Vertex AI requires mimeType even for YouTube URLs
                 # See: https://cloud.google.com/vertex-ai/generative-ai/docs/model-reference/inference
                 logger.info("Detected YouTube URL, using FileData pattern with video/mp4")
                 from google.genai import types
 
-                # Run in thread pool for true async parallelism
-                response = await asyncio.to_thread(
-                    self.client.models.generate_content,
+                response = await self._generate_content(
                     model=model,
                     contents=types.Content(
                         role="user",
@@ -188,16 +447,18 @@ class GeminiMediaAnalysisProvider(MediaAnalysisProvider):
                                     mime_type="video/mp4"
                                 )
                             ),
+                            types.Part(text=QUESTION_HEADER),
                             types.Part(text=question)
                         ]
                     ),
                     config=types.GenerateContentConfig(
-                        system_instruction=ANALYSIS_SYSTEM_INSTRUCTION
+                        system_instruction=ANALYSIS_SYSTEM_INSTRUCTION,
+                        **structured_params
                     )
                 )
-            elif normalized_url.startswith("gs://") or normalized_url.startswith("http://") or normalized_url.startswith("https://"):
+            elif url_kind == "uri":
                 # GCS or HTTP URLs: Use Part.from_uri() with MIME type
-                mime_type = self._get_mime_type(normalized_url)
+                mime_type = await self._resolve_mime_type(normalized_url)
                 logger.debug(f"Using Part.from_uri() with mime_type={mime_type}")
 
                 # Build generation_config for audio-only files
@@ -206,31 +467,41 @@ class GeminiMediaAnalysisProvider(MediaAnalysisProvider):
                 from google.genai import types
                 
                 config_params = {
-                    'system_instruction': ANALYSIS_SYSTEM_INSTRUCTION
+                    'system_instruction': ANALYSIS_SYSTEM_INSTRUCTION,
+                    **structured_params
                 }
                 if self._is_audio_file(mime_type) or audio_timestamp:
                     config_params['audio_timestamp'] = True
                     logger.debug("Enabled audio_timestamp=True for accurate word-level timestamps")
 
-                # Build request arguments
-                generate_kwargs = {
-                    "model": model,
-                    "contents": [
+                # Repeat questions about long media reuse an explicit cache holding
+                # the file (and system instruction) instead of re-billing its tokens
+                cache_name = await self._get_file_cache(model, normalized_url, mime_type)
+                if cache_name:
+                    del config_params['system_instruction']
+                    config_params['cached_content'] = cache_name
+                    contents = [Part.from_text(text=question)]
+                else:
+                    # File first so the shared prefix also benefits from implicit caching
+                    contents = [
                         Part.from_uri(
                             file_uri=normalized_url,
                             mime_type=mime_type
                         ),
+                        Part.from_text(text=QUESTION_HEADER),
                         Part.from_text(text=question)
                     ]
+                
+                # Build request arguments
+                generate_kwargs = {
+                    "model": model,
+                    "contents": contents
                 }
                 
                 # Always add config (includes system_instruction for laconic responses)
                 generate_kwargs["config"] = types.GenerateContentConfig(**config_params)
                 
-                # Run in thread pool for true async parallelism
-                response = await asyncio.to_thread(
-                    lambda: self.client.models.generate_content(**generate_kwargs)
-                )
+                response = await self._generate_content(**generate_kwargs)
             else:
                 raise ValueError(
                     f"Unsupported file URL format: {file_url}. "
@@ -248,9 +519,14 @@ class GeminiMediaAnalysisProvider(MediaAnalysisProvider):
                 metadata['prompt_tokens'] = getattr(usage, 'prompt_token_count', 0)
                 metadata['response_tokens'] = getattr(usage, 'candidates_token_count', 0)
                 metadata['total_tokens'] = getattr(usage, 'total_token_count', 0)
+                # Prompt tokens served from implicit/explicit context caches
+                metadata['cached_tokens'] = getattr(usage, 'cached_content_token_count', 0) or 0
                 logger.debug(f"Token usage: {metadata}")
             
-            return MediaAnalysisResult(
+            if response_schema is not None:
+                metadata['structured'] = loads_json(analysis_text)
+            
+            result = MediaAnalysisResult(
                 analysis=analysis_text,
                 model_used=model,
                 file_url=file_url,
@@ -258,10 +534,12 @@ class GeminiMediaAnalysisProvider(MediaAnalysisProvider):
                 success=True,
                 metadata=metadata
             )
+            self._result_cache.set(cache_key, result)
+            return result
         
         except Exception as e:
             error_msg = str(e)
-            logger.error(f"Media analysis failed: {error_msg}", exc_info=True)
+            self._log_analysis_failure(e)
             
             # User-friendly error messages
             if "authentication" in error_msg.lower() or "credentials" in error_msg.lower():
@@ -295,64 +573,432 @@ class GeminiMediaAnalysisProvider(MediaAnalysisProvider):
                 error_message=user_error
             )
     
-    def _get_mime_type(self, file_url: str) -> str:
+    async def analyze_media_multi(
+        self,
+        file_url: str,
+        questions: List[str],
+        model_name: Optional[str] = None,
+        temperature: float = 0.1,
+        audio_timestamp: bool = False
+    ) -> List[MediaAnalysisResult]:
         """
-        Determine MIME type from file extension.
+        Answer several questions about one file in a single Gemini request.
+        
+        The file's input tokens and one request of RPM quota are spent once
+        instead of once per question. Answers come back as a JSON array.
         
         Args:
-            file_url: File URL or path
+            file_url: GCS URI, HTTP/HTTPS URL or YouTube URL
+            questions: Questions about the media
+            model_name: Optional model override
+            temperature: Generation temperature
+            audio_timestamp: Enable accurate timestamps for audio-only files
         
         Returns:
-            MIME type string
+            One MediaAnalysisResult per question, in order
         """
-        # Map extensions to MIME types
-        mime_types = {
-            # Videos
-            'mp4': 'video/mp4',
-            'mov': 'video/quicktime',
-            'avi': 'video/x-msvideo',
-            'flv': 'video/x-flv',
-            'mpg': 'video/mpeg',
-            'mpeg': 'video/mpeg',
-            'webm': 'video/webm',
-            'wmv': 'video/x-ms-wmv',
-            '3gp': 'video/3gpp',
+        if not file_url or not questions:
+            raise ValueError("file_url and questions are required")
+        if len(questions) == 1:
+            return [await self.analyze_media(file_url, questions[0], model_name, temperature, audio_timestamp)]
+        
+        from google.genai import types
+        
+        model = model_name or self.default_model
+        normalized_url = self._normalize_file_url(file_url)
+        is_youtube = _url_kind(normalized_url) == "youtube"
+        mime_type = "video/mp4" if is_youtube else await self._resolve_mime_type(normalized_url)
+        
+        config_params: Dict[str, Any] = {
+            'system_instruction': ANALYSIS_SYSTEM_INSTRUCTION,
+            'temperature': temperature,
+            'response_mime_type': "application/json",
+            'response_schema': {
+                'type': 'ARRAY',
+                'items': {'type': 'STRING'},
+                'minItems': len(questions),
+                'maxItems': len(questions)
+            }
+        }
+        if not is_youtube and (self._is_audio_file(mime_type) or audio_timestamp):
+            config_params['audio_timestamp'] = True
+        
+        numbered = "\n".join(f"{i}: {question}" for i, question in enumerate(questions))
+        try:
+            response = await self._generate_content(
+                model=model,
+                contents=[
+                    Part.from_uri(file_uri=normalized_url, mime_type=mime_type),
+                    Part.from_text(text=(
+                        "Answer each question. Return a JSON array of answer strings, "
+                        f"one per question, in question order.\n{numbered}"
+                    ))
+                ],
+                config=types.GenerateContentConfig(**config_params)
+            )
+            answers = loads_json(response.text)
+            if not isinstance(answers, list) or len(answers) != len(questions):
+                raise ValueError(f"Expected {len(questions)} answers, got: {response.text[:200]}")
+        except Exception as e:
+            logger.error(f"Multi-question media analysis failed: {e}")
+            return [
+                MediaAnalysisResult(
+                    analysis="",
+                    model_used=model,
+                    file_url=file_url,
+                    question=question,
+                    success=False,
+                    error_message=f"Media analysis failed: {e}"
+                )
+                for question in questions
+            ]
+        
+        metadata = {'batched_questions': len(questions)}
+        if hasattr(response, 'usage_metadata'):
+            usage = response.usage_metadata
+            metadata['prompt_tokens'] = getattr(usage, 'prompt_token_count', 0)
+            metadata['response_tokens'] = getattr(usage, 'candidates_token_count', 0)
+            metadata['total_tokens'] = getattr(usage, 'total_token_count', 0)
+            metadata['cached_tokens'] = getattr(usage, 'cached_content_token_count', 0) or 0
+        
+        return [
+            MediaAnalysisResult(
+                analysis=str(answer),
+                model_used=model,
+                file_url=file_url,
+                question=question,
+                success=True,
+                metadata=dict(metadata)
+            )
+            for question, answer in zip(questions, answers)
+        ]
+    
+    async def analyze_media_batch(
+        self,
+        requests: List[Dict[str, Any]],
+        gcs_prefix: str,
+        model_name: Optional[str] = None,
+        temperature: float = 0.1
+    ) -> List[MediaAnalysisResult]:
+        """
+        Analyze many files as one Vertex AI batch prediction job.
+        
+        For non-interactive work (bulk transcription, indexing): batch jobs are
+        billed at a discount and don't count against the online RPM quota, but
+        can take minutes to hours to complete.
+        
+        Args:
+            requests: Dicts with 'file_url', 'question' and optional 'audio_timestamp'
+            gcs_prefix: gs:// folder for the job's input JSONL and output
+            model_name: Optional model override
+            temperature: Generation temperature for every request
+        
+        Returns:
+            One MediaAnalysisResult per request, in input order
+        """
+        if not requests:
+            return []
+        if not gcs_prefix.startswith("gs://"):
+            raise ValueError("gcs_prefix must be a gs:// URI")
+        
+        from google.genai import types
+        
+        model = model_name or self.default_model
+        prefix = gcs_prefix.rstrip('/')
+        lines = []
+        keys = []
+        for item in requests:
+            file_uri = self._normalize_file_url(item['file_url'])
+            mime_type = self._get_mime_type(file_uri)
+            generation_config: Dict[str, Any] = {'temperature': temperature}
+            if self._is_audio_file(mime_type) or item.get('audio_timestamp'):
+                generation_config['audioTimestamp'] = True
+            lines.append(json.dumps({
+                'request': {
+                    'contents': [{
+                        'role': 'user',
+                        'parts': [
+                            {'fileData': {'fileUri': file_uri, 'mimeType': mime_type}},
+                            {'text': item['question']}
+                        ]
+                    }],
+                    'systemInstruction': {'parts': [{'text': ANALYSIS_SYSTEM_INSTRUCTION}]},
+                    'generationConfig': generation_config
+                }
+            }))
+            keys.append((file_uri, item['question']))
+        
+        batch_id = hashlib.sha256("\n".join(lines).encode()).hexdigest()[:16]
+        input_uri = f"{prefix}/{batch_id}/input.jsonl"
+        await asyncio.to_thread(self._write_gcs_text, input_uri, "\n".join(lines) + "\n")
+        
+        job = await self.client.aio.batches.create(
+            model=model,
+            src=input_uri,
+            config=types.CreateBatchJobConfig(dest=f"{prefix}/{batch_id}/output")
+        )
+        logger.info(f"Submitted batch job {job.name} with {len(requests)} requests")
+        
+        terminal_states = {
+            types.JobState.JOB_STATE_SUCCEEDED,
+            types.JobState.JOB_STATE_FAILED,
+            types.JobState.JOB_STATE_CANCELLED,
+            types.JobState.JOB_STATE_EXPIRED,
+        }
+        interval = BATCH_POLL_INITIAL_SECONDS
+        deadline = time.monotonic() + BATCH_TIMEOUT_SECONDS
+        while job.state not in terminal_states:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Batch job {job.name} did not finish within {BATCH_TIMEOUT_SECONDS}s")
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, BATCH_POLL_MAX_SECONDS)
+            job = await self.client.aio.batches.get(name=job.name)
+        
+        if job.state != types.JobState.JOB_STATE_SUCCEEDED:
+            error = f"Batch job {job.name} ended in state {job.state}: {job.error}"
+            logger.error(error)
+            return [
+                MediaAnalysisResult(
+                    analysis="",
+                    model_used=model,
+                    file_url=item['file_url'],
+                    question=item['question'],
+                    success=False,
+                    error_message=error
+                )
+                for item in requests
+            ]
+        
+        # Output rows echo their request; match them back by (file, question)
+        outputs: Dict[tuple, List[Dict[str, Any]]] = {}
+        for text in await asyncio.to_thread(self._read_gcs_predictions, job.dest.gcs_uri):
+            for line in text.splitlines():
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                parts = row['request']['contents'][0]['parts']
+                key = (parts[0]['fileData']['fileUri'], parts[1]['text'])
+                outputs.setdefault(key, []).append(row)
+        
+        results = []
+        for item, key in zip(requests, keys):
+            rows = outputs.get(key)
+            row = rows.pop(0) if rows else None
+            candidates = (row or {}).get('response', {}).get('candidates') or []
+            if not candidates:
+                status = row.get('status') if row else "missing from batch output"
+                results.append(MediaAnalysisResult(
+                    analysis="",
+                    model_used=model,
+                    file_url=item['file_url'],
+                    question=item['question'],
+                    success=False,
+                    error_message=f"Batch analysis failed: {status or 'no candidates returned'}"
+                ))
+                continue
             
-            # Images
-            'jpg': 'image/jpeg',
-            'jpeg': 'image/jpeg',
-            'png': 'image/png',
-            'gif': 'image/gif',
-            'webp': 'image/webp',
-            'bmp': 'image/bmp',
-            'heic': 'image/heic',
-            'heif': 'image/heif',
+            usage = row['response'].get('usageMetadata', {})
+            results.append(MediaAnalysisResult(
+                analysis="".join(part.get('text', '') for part in candidates[0]['content']['parts']),
+                model_used=model,
+                file_url=item['file_url'],
+                question=item['question'],
+                success=True,
+                metadata={
+                    'prompt_tokens': usage.get('promptTokenCount', 0),
+                    'response_tokens': usage.get('candidatesTokenCount', 0),
+                    'total_tokens': usage.get('totalTokenCount', 0),
+                    'batch_job': job.name
+                }
+            ))
+        
+        logger.info(f"Batch job {job.name} completed: {sum(r.success for r in results)}/{len(results)} succeeded")
+        return results
+    
+    def _get_storage_client(self):
+        """Lazily created GCS client shared by the metadata and batch helpers."""
+        if self._storage_client is None:
+            from google.cloud import storage
+            self._storage_client = storage.Client(project=self.project_id)
+        return self._storage_client
+    
+    def _write_gcs_text(self, gcs_uri: str, text: str) -> None:
+        """Write a text object to GCS (blocking; run in a thread)."""
+        bucket, _, object_path = gcs_uri[len("gs://"):].partition('/')
+        blob = self._get_storage_client().bucket(bucket).blob(object_path)
+        blob.upload_from_string(text, content_type="application/jsonl")
+    
+    def _read_gcs_predictions(self, gcs_dir: str) -> List[str]:
+        """Read every predictions JSONL file under a batch job's output folder (blocking)."""
+        bucket, _, prefix = gcs_dir[len("gs://"):].partition('/')
+        client = self._get_storage_client()
+        return [
+            blob.download_as_text()
+            for blob in client.list_blobs(bucket, prefix=prefix)
+            if blob.name.endswith("predictions.jsonl")
+        ]
+    
+    def _log_analysis_failure(self, error: Exception) -> None:
+        """
+        Log a failed analysis without paying for a traceback on every error.
+        
+        Tracebacks are only formatted at DEBUG verbosity, and while the quota
+        breaker is open (every call fails the same way) only one failure in
+        BREAKER_LOG_SAMPLE_RATE is logged.
+        """
+        if self._breaker_open_until > time.monotonic():
+            self._breaker_error_count += 1
+            if self._breaker_error_count % BREAKER_LOG_SAMPLE_RATE != 1:
+                return
+        else:
+            self._breaker_error_count = 0
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.error(f"Media analysis failed: {error}", exc_info=True)
+        else:
+            logger.error("Media analysis failed: %s: %s", type(error).__name__, error)
+    
+    async def _generate_content(self, **generate_kwargs):
+        """
+        Call Gemini through the native async client under the concurrency and RPM limits.
+        
+        Requests rotate across the client pool; a client that gets rate
+        limited sits out for its Retry-After. Rate-limit and transient errors
+        are retried with jittered exponential backoff (immediately on another
+        client when one is available). Daily quota exhaustion on every client
+        opens a circuit breaker so later calls fail fast instead of burning
+        requests that can't succeed.
+        """
+        # Context caches live in the primary client's project
+        config = generate_kwargs.get('config')
+        pinned = bool(config is not None and getattr(config, 'cached_content', None))
+        
+        for attempt in range(ANALYSIS_MAX_ATTEMPTS):
+            remaining = self._breaker_open_until - time.monotonic()
+            if remaining > 0:
+                raise RuntimeError(f"Daily API quota exceeded; retrying disabled for {remaining:.0f}s")
             
-            # Audio
-            'mp3': 'audio/mpeg',
-            'wav': 'audio/wav',
-            'aac': 'audio/aac',
-            'ogg': 'audio/ogg',
-            'flac': 'audio/flac',
-            'aiff': 'audio/aiff',
+            slot = self._pick_slot(pinned)
+            try:
+                async with self._semaphore:
+                    await slot.rate_limiter.acquire()
+                    return await slot.client.aio.models.generate_content(**generate_kwargs)
+            except errors.APIError as e:
+                daily = _is_daily_quota_error(e)
+                if e.code == 429:
+                    cooldown = QUOTA_BREAKER_SECONDS if daily else _retry_after_seconds(e, POOL_CLIENT_COOLDOWN_SECONDS)
+                    slot.cooldown_until = time.monotonic() + cooldown
+                
+                now = time.monotonic()
+                other_available = not pinned and any(s.cooldown_until <= now for s in self._slots)
+                if daily and not other_available:
+                    self._breaker_open_until = min(s.cooldown_until for s in self._slots)
+                    raise
+                if (e.code not in RETRYABLE_STATUS_CODES and not daily) or attempt == ANALYSIS_MAX_ATTEMPTS - 1:
+                    raise
+                if other_available and e.code == 429:
+                    logger.warning(f"Gemini client '{slot.label}' rate limited, rotating to next client")
+                    continue
+                delay = min(ANALYSIS_RETRY_MAX_DELAY, ANALYSIS_RETRY_BASE_DELAY * (2 ** attempt))
+                logger.warning(f"Gemini request failed ({e.code}), retrying in ~{delay:.0f}s")
+                # Back off outside the semaphore so waiting doesn't hold a slot
+                await asyncio.sleep(delay + random.uniform(0, delay))
+    
+    async def _get_file_cache(self, model: str, normalized_url: str, mime_type: str) -> Optional[str]:
+        """
+        Return an explicit context cache name holding the media file, creating it if worthwhile.
+        
+        Only audio/video is cached, and only from the second question about
+        the same file. Files below the model's cache minimum (creation fails)
+        are remembered so they aren't retried until the entry expires.
+        """
+        if not (mime_type.startswith('video/') or self._is_audio_file(mime_type)):
+            return None
+        
+        key = f"{model}|{normalized_url}"
+        cache_name = self._file_caches.get(key)
+        if cache_name is not None:
+            return cache_name or None
+        
+        if self._files_seen.get(key) is None:
+            self._files_seen.set(key, True)
+            return None
+        
+        from google.genai import types
+        
+        try:
+            cache = await self.client.aio.caches.create(
+                model=model,
+                config=types.CreateCachedContentConfig(
+                    contents=[types.Content(
+                        role="user",
+                        parts=[Part.from_uri(file_uri=normalized_url, mime_type=mime_type)]
+                    )],
+                    system_instruction=ANALYSIS_SYSTEM_INSTRUCTION,
+                    ttl=f"{FILE_CACHE_TTL_SECONDS}s"
+                )
+            )
+        except Exception as e:
+            logger.warning(f"Context cache creation failed for {normalized_url[:80]}, sending file inline: {e}")
+            self._file_caches.set(key, "")
+            return None
+        
+        self._file_caches.set(key, cache.name)
+        logger.info(f"Created context cache {cache.name} for {normalized_url[:80]}")
+        return cache.name
+    
+    async def _resolve_mime_type(self, file_url: str) -> str:
+        """
+        Determine MIME type, asking the server when the URL has no usable extension.
+        
+        gs:// objects report their stored content type; other HTTP(S) URLs are
+        sent a HEAD request. Only when both fail does _get_mime_type's
+        video/mp4 default apply.
+        """
+        mime_type = _mime_for_url(file_url)
+        if mime_type:
+            return mime_type
+        
+        cached = self._content_types.get(file_url)
+        if cached is None:
+            try:
+                if file_url.startswith("gs://"):
+                    cached = await asyncio.to_thread(self._gcs_content_type, file_url)
+                elif file_url.startswith(("http://", "https://")):
+                    async with httpx.AsyncClient(timeout=CONTENT_TYPE_LOOKUP_TIMEOUT_SECONDS) as client:
+                        response = await client.head(file_url, follow_redirects=True)
+                    cached = response.headers.get("content-type", "").split(";")[0].strip()
+            except Exception as e:
+                logger.debug(f"Content-Type lookup failed for {file_url[:80]}: {e}")
             
-            # Documents
-            'pdf': 'application/pdf',
-            'txt': 'text/plain',
-            'html': 'text/html',
-            'json': 'application/json',
-        }
+            # Generic types tell Gemini nothing; treat them as unknown
+            if not cached or cached == "application/octet-stream":
+                cached = ""
+            self._content_types.set(file_url, cached)
         
-        # Extract path without query parameters
-        url_path = file_url.split('?')[0]
+        return cached or self._get_mime_type(file_url)
+    
+    def _gcs_content_type(self, gcs_uri: str) -> Optional[str]:
+        """Stored Content-Type of a GCS object (blocking; run in a thread)."""
+        bucket, _, object_path = gcs_uri[len("gs://"):].partition('/')
+        blob = self._get_storage_client().bucket(bucket).get_blob(
+            object_path, timeout=CONTENT_TYPE_LOOKUP_TIMEOUT_SECONDS
+        )
+        return blob.content_type if blob else None
+    
+    def _get_mime_type(self, file_url: str) -> str:
+        """
+        Determine MIME type from file extension.
         
-        # Extract extension (handle URLs like /path/file.mp4)
-        if '.' in url_path:
-            ext = url_path.lower().rsplit('.', 1)[-1]
-            mime_type = mime_types.get(ext)
-            if mime_type:
-                logger.debug(f"Detected MIME type from extension '{ext}': {mime_type}")
-                return mime_type
+        Args:
+            file_url: File URL or path
+        
+        Returns:
+            MIME type string
+        """
+        mime_type = _mime_for_url(file_url)
+        if mime_type:
+            return mime_type
         
         # Fallback: try to guess from common patterns
         logger.warning(f"Could not determine MIME type from extension in URL: {file_url}")
@@ -444,33 +1090,4 @@ class GeminiMediaAnalysisProvider(MediaAnalysisProvider):
         """Normalize known GCS HTTPS URLs to gs:// URIs for Vertex AI access."""
         if not file_url:
             return file_url
-
-        stripped = file_url.strip()
-
-        # Already a gs:// URI
-        if stripped.startswith("gs://"):
-            return stripped
-
-        try:
-            parsed = urlparse(stripped)
-        except Exception:
-            logger.debug(f"Could not parse URL for normalization: {stripped}")
-            return stripped
-
-        host = parsed.netloc.lower()
-
-        # Pattern: https://storage.googleapis.com/<bucket>/<object>
-        if host == "storage.googleapis.com":
-            path = parsed.path.lstrip('/')
-            bucket, _, object_path = path.partition('/')
-            if bucket and object_path:
-                return f"gs://{bucket}/{object_path}"
-
-        # Pattern: <bucket>.storage.googleapis.com/<object>
-        if host.endswith(".storage.googleapis.com"):
-            bucket = host[:-len(".storage.googleapis.com")]
-            object_path = parsed.path.lstrip('/')
-            if bucket and object_path:
-                return f"gs://{bucket}/{object_path}"
-
-        return stripped
+        return _normalize_gcs_url(file_url.strip())
@@ -4,10 +4,14 @@ Google Cloud Text-to-Speech provider implementation.
 Implements VoiceGenerationProvider using Google Cloud TTS API with Neural2 and Studio voices.
 """
 
+import asyncio
 import logging
 import io
+import struct
+from functools import lru_cache
 from typing import List, Optional, Dict, Any
 from google.cloud import texttospeech
+from google.cloud.texttospeech_v1.services.text_to_speech.transports import TextToSpeechGrpcTransport
 from pydub import AudioSegment
 
 from services.base.VoiceGenerationProvider import (
@@ -16,13 +20,139 @@ from services.base.VoiceGenerationProvider import (
     GeneratedVoiceResult,
     VoiceInfo
 )
+from utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# MPEG audio frame header tables: bitrates (kbps) by [version is MPEG-1][layer III index]
+_MP3_BITRATES = {
+    True: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    False: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+# RIFF file header ("RIFF", size, "WAVE") and per-chunk header (id, size)
+_RIFF_HEADER = struct.Struct("<4sI4s")
+_RIFF_CHUNK = struct.Struct("<4sI")
+# Opus granule positions always count 48 kHz samples
+_OPUS_GRANULE_RATE = 48000
+# Gemini TTS model per VoiceGenerationRequest.quality; Pro only pays off for
+# nuanced emotional direction in style_prompt
+TTS_MODELS = {
+    "fast": "gemini-2.5-flash-tts",
+    "high": "gemini-2.5-pro-tts",
+}
+
+# The voice catalog changes on the scale of months
+VOICE_LIST_CACHE_TTL_SECONDS = 24 * 3600
+# Keepalive pings stop idle load balancers from dropping the warm gRPC channel.
+# The unlimited message sizes match the stock transport's own channel; without
+# them gRPC's 4 MiB receive cap rejects long LINEAR16 responses.
+TTS_CHANNEL_OPTIONS = [
+    ("grpc.max_send_message_length", -1),
+    ("grpc.max_receive_message_length", -1),
+    ("grpc.keepalive_time_ms", 30_000),
+    ("grpc.keepalive_timeout_ms", 10_000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.max_connection_idle_ms", 300_000),
+]
+
+
+def _wav_duration(audio_bytes: bytes) -> Optional[float]:
+    """Duration from the RIFF fmt/data chunk headers, or None if not a parseable WAV."""
+    # Walk the chunk headers in place; only a few dozen header bytes are touched
+    view = memoryview(audio_bytes)
+    if len(view) < 12:
+        return None
+    riff, _, wave = _RIFF_HEADER.unpack_from(view, 0)
+    if riff != b"RIFF" or wave != b"WAVE":
+        return None
+    
+    offset = 12
+    byte_rate = None
+    while offset + 8 <= len(view):
+        chunk_id, chunk_size = _RIFF_CHUNK.unpack_from(view, offset)
+        if chunk_id == b"fmt ":
+            (byte_rate,) = struct.unpack_from("<I", view, offset + 16)
+        elif chunk_id == b"data":
+            if not byte_rate:
+                return None
+            # Streamed WAVs may leave the size unset; use what's actually present
+            data_size = min(chunk_size, len(view) - offset - 8)
+            return data_size / byte_rate
+        offset += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+def _mp3_duration(audio_bytes: bytes) -> Optional[float]:
+    """Duration from the first frame header (Xing/Info frame count, else CBR size), or None."""
+    offset = 0
+    if audio_bytes[:3] == b"ID3" and len(audio_bytes) >= 10:
+        # ID3v2 size is a 28-bit syncsafe integer
+        size = (audio_bytes[6] << 21) | (audio_bytes[7] << 14) | (audio_bytes[8] << 7) | audio_bytes[9]
+        offset = 10 + size
+    
+    if offset + 4 > len(audio_bytes):
+        return None
+    (header,) = struct.unpack_from(">I", audio_bytes, offset)
+    if header >> 21 != 0x7FF:
+        return None
+    
+    version = (header >> 19) & 0x3
+    layer = (header >> 17) & 0x3
+    bitrate_index = (header >> 12) & 0xF
+    rate_index = (header >> 10) & 0x3
+    channel_mode = (header >> 6) & 0x3
+    # Only Layer III (what TTS emits) is handled
+    if layer != 1 or version not in _MP3_SAMPLE_RATES or rate_index == 3 or bitrate_index in (0, 15):
+        return None
+    
+    mpeg1 = version == 3
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    samples_per_frame = 1152 if mpeg1 else 576
+    
+    # A Xing/Info header after the side info carries the exact frame count (VBR or CBR)
+    side_info = (32 if channel_mode != 3 else 17) if mpeg1 else (17 if channel_mode != 3 else 9)
+    xing = offset + 4 + side_info
+    if audio_bytes[xing:xing + 4] in (b"Xing", b"Info") and xing + 12 <= len(audio_bytes):
+        (flags,) = struct.unpack_from(">I", audio_bytes, xing + 4)
+        if flags & 0x1:
+            (frames,) = struct.unpack_from(">I", audio_bytes, xing + 8)
+            return frames * samples_per_frame / sample_rate
+    
+    bitrate = _MP3_BITRATES[mpeg1][bitrate_index] * 1000
+    return (len(audio_bytes) - offset) * 8 / bitrate
+
+
+def _ogg_opus_duration(audio_bytes: bytes) -> Optional[float]:
+    """Duration from the last Ogg page's granule position minus Opus pre-skip, or None."""
+    head = audio_bytes.find(b"OpusHead")
+    last_page = audio_bytes.rfind(b"OggS")
+    if head < 0 or last_page < 0 or last_page + 14 > len(audio_bytes) or head + 12 > len(audio_bytes):
+        return None
+    (pre_skip,) = struct.unpack_from("<H", audio_bytes, head + 10)
+    (granule,) = struct.unpack_from("<q", audio_bytes, last_page + 6)
+    if granule < 0:
+        return None
+    return max(granule - pre_skip, 0) / _OPUS_GRANULE_RATE
+
+
+@lru_cache(maxsize=1)
+def _shared_tts_client() -> texttospeech.TextToSpeechClient:
+    """Process-wide TTS client so every provider shares one keepalive gRPC channel."""
+    channel = TextToSpeechGrpcTransport.create_channel(options=TTS_CHANNEL_OPTIONS)
+    return texttospeech.TextToSpeechClient(transport=TextToSpeechGrpcTransport(channel=channel))
+
+
+_HEADER_DURATION_PARSERS = {
+    "WAV": _wav_duration,
+    "MP3": _mp3_duration,
+    "OGG": _ogg_opus_duration,
+}
+
 
 class GoogleTTSProvider(VoiceGenerationProvider):
     """
-    Google Cloud Text-to-Speech implementation with Gemini 2.5 Pro TTS.
+    Google Cloud Text-to-Speech implementation with Gemini 2.5 TTS.
     
     Supports:
     - Gemini 2.5 Pro TTS (highest quality, prompt-based style control)
@@ -32,13 +162,19 @@ class GoogleTTSProvider(VoiceGenerationProvider):
     """
     
     def __init__(self):
-        """Initialize Google TTS client for Gemini 2.5 Pro TTS."""
-        self.client = texttospeech.TextToSpeechClient()
-        logger.info("GoogleTTSProvider initialized with Gemini 2.5 Pro TTS")
+        """Initialize Google TTS client for Gemini 2.5 TTS."""
+        self.client = _shared_tts_client()
+        # list_voices results keyed by language_code (None = all languages)
+        self._voices_cache = TTLCache(maxsize=128, ttl=VOICE_LIST_CACHE_TTL_SECONDS)
+        # Per-language {voice_id: VoiceInfo} for O(1) get_voice_info, same expiry
+        self._voice_index_by_lang = TTLCache(maxsize=128, ttl=VOICE_LIST_CACHE_TTL_SECONDS)
+        logger.info("GoogleTTSProvider initialized with Gemini 2.5 TTS")
     
     async def generate_voice(self, request: VoiceGenerationRequest) -> GeneratedVoiceResult:
         """
-        Generate speech using Gemini 2.5 Pro TTS with prompt-based style control.
+        Generate speech using Gemini 2.5 TTS with prompt-based style control.
+        
+        request.quality picks the model: Flash ("fast", default) or Pro ("high").
         
         Args:
             request: Voice generation request with text and settings
@@ -50,7 +186,8 @@ class GoogleTTSProvider(VoiceGenerationProvider):
             RuntimeError: If TTS generation fails
         """
         try:
-            logger.info(f"Generating voice with Gemini 2.5 Pro TTS: {len(request.text)} chars, voice={request.voice_id}")
+            model_name = TTS_MODELS.get(request.quality, TTS_MODELS["fast"])
+            logger.info(f"Generating voice with {model_name}: {len(request.text)} chars, voice={request.voice_id}")
             
             # Gemini TTS uses BOTH text AND prompt for style control
             # Use custom style_prompt if provided, otherwise default to natural tone
@@ -62,11 +199,11 @@ class GoogleTTSProvider(VoiceGenerationProvider):
                 prompt=style_prompt
             )
             
-            # Configure voice with Gemini 2.5 Pro model
+            # Configure voice with the selected Gemini TTS model
             voice = texttospeech.VoiceSelectionParams(
                 language_code=request.language_code,
                 name=request.voice_id,  # Simple names: "Aoede", "Charon", "Kore", etc.
-                model_name="gemini-2.5-pro-tts"
+                model_name=model_name
             )
             
             # Map audio encoding
@@ -85,8 +222,9 @@ class GoogleTTSProvider(VoiceGenerationProvider):
                 sample_rate_hertz=request.sample_rate_hertz
             )
             
-            # Generate speech
-            response = self.client.synthesize_speech(
+            # Generate speech off the event loop (unary gRPC call blocks for the full synthesis)
+            response = await asyncio.to_thread(
+                self.client.synthesize_speech,
                 input=synthesis_input,
                 voice=voice,
                 audio_config=audio_config
@@ -110,6 +248,7 @@ class GoogleTTSProvider(VoiceGenerationProvider):
                     "language_code": request.language_code,
                     "speaking_rate": request.speaking_rate,
                     "pitch": request.pitch,
+                    "tts_model": model_name,
                     "provider": "google_tts"
                 }
             )
@@ -129,8 +268,18 @@ class GoogleTTSProvider(VoiceGenerationProvider):
         Returns:
             Duration in seconds
         """
+        parser = _HEADER_DURATION_PARSERS.get(encoding)
+        if parser:
+            # Header-only: avoids decoding the whole file just to count samples
+            try:
+                duration = parser(audio_bytes)
+            except struct.error:
+                duration = None
+            if duration is not None:
+                return duration
+        
         try:
-            # Load audio with pydub
+            # Fall back to a full decode with pydub
             audio_io = io.BytesIO(audio_bytes)
             
             if encoding == "MP3":
@@ -158,8 +307,12 @@ class GoogleTTSProvider(VoiceGenerationProvider):
             language_code: Optional filter by language (e.g., "en-US")
             
         Returns:
-            List of available voices
+            List of available voices (cached per language for a day)
         """
+        cached = self._voices_cache.get(language_code)
+        if cached is not None:
+            return list(cached)
+        
         try:
             response = self.client.list_voices(language_code=language_code)
             
@@ -185,12 +338,41 @@ class GoogleTTSProvider(VoiceGenerationProvider):
                     voice_type=voice_type
                 ))
             
+            self._voices_cache.set(language_code, tuple(voices))
             return voices
             
         except Exception as e:
             logger.error(f"Failed to list voices: {str(e)}")
             return []
     
+    async def list_voices_async(self, language_code: Optional[str] = None) -> List[VoiceInfo]:
+        """
+        Async list_voices: cache hits return immediately, misses run the RPC in a worker thread.
+        
+        Args:
+            language_code: Optional filter by language (e.g., "en-US")
+            
+        Returns:
+            List of available voices
+        """
+        cached = self._voices_cache.get(language_code)
+        if cached is not None:
+            return list(cached)
+        return await asyncio.to_thread(self.list_voices, language_code)
+    
+    async def list_voices_multi(self, language_codes: List[str]) -> Dict[str, List[VoiceInfo]]:
+        """
+        List voices for several languages with the RPCs issued in parallel.
+        
+        Args:
+            language_codes: Languages to enumerate (e.g., ["en-US", "de-DE"])
+            
+        Returns:
+            Mapping of language code to its voices
+        """
+        results = await asyncio.gather(*(self.list_voices_async(code) for code in language_codes))
+        return dict(zip(language_codes, results))
+    
     def get_voice_info(self, voice_id: str) -> Optional[VoiceInfo]:
         """
         Get information about a specific voice.
@@ -204,10 +386,15 @@ class GoogleTTSProvider(VoiceGenerationProvider):
         # Extract language code from voice_id (e.g., "en-US" from "en-US-Neural2-J")
         lang_code = "-".join(voice_id.split("-")[:2]) if "-" in voice_id else None
         
-        if lang_code:
+        if not lang_code:
+            return None
+        
+        index = self._voice_index_by_lang.get(lang_code)
+        if index is None:
             voices = self.list_voices(language_code=lang_code)
-            for voice in voices:
-                if voice.voice_id == voice_id:
-                    return voice
+            index = {voice.voice_id: voice for voice in voices}
+            if voices:
+                # Empty means the lookup failed; retry next time
+                self._voice_index_by_lang.set(lang_code, index)
         
-        return None
+        return index.get(voice_id)
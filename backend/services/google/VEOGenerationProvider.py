@@ -2,34 +2,73 @@
 
 import os
 import io
+import hashlib
 import logging
+import random
 import tempfile
+import time
 import uuid
-from typing import Optional
+from typing import Optional, Tuple
 from datetime import datetime
 from PIL import Image
 from google import genai
 from google.genai import types
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
 import asyncio
-from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from requests.adapters import HTTPAdapter
 
 from services.base.VideoGenerationProvider import (
     VideoGenerationProvider,
     VideoGenerationOperation,
     GeneratedVideo
 )
+from services.google.genai_http import pooled_http_options
+from utils.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Reference images already in one of these formats can be sent as-is
+REFERENCE_PASSTHROUGH_MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png"}
+# Re-encode quality for everything else (4:4:4 chroma keeps edges clean)
+REFERENCE_JPEG_QUALITY = 92
+# Longest side sent to Veo; output is at most 1080p, so larger inputs are only downsampled there
+REFERENCE_MAX_SIDE = 1920
 
-def async_wrap(func):
-    """Decorator to run sync operations in executor."""
-    @wraps(func)
-    async def wrapper(*args, **kwargs):
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, lambda: func(*args, **kwargs))
-    return wrapper
+# Reference images are uploaded once under this prefix, keyed by content hash
+REFERENCE_CACHE_PREFIX = "ref-cache"
+# Content hashes already known to exist in GCS (skips the exists() round-trip)
+REFERENCE_CACHE_MAXSIZE = 256
+REFERENCE_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png"}
+
+# Downloaded videos stay in memory up to this size, then spill to a temp file
+VIDEO_SPOOL_MAX_MEMORY = 4 * 1024 * 1024
+# Videos at least this large are fetched with parallel ranged GETs
+PARALLEL_DOWNLOAD_MIN_SIZE = 32 * 1024 * 1024
+PARALLEL_DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+PARALLEL_DOWNLOAD_WORKERS = 8
+PARALLEL_DOWNLOAD_DEADLINE = 120
+
+# requests pool for the shared GCS client (default keeps only 10 connections per host)
+GCS_POOL_CONNECTIONS = 32
+GCS_POOL_MAXSIZE = 64
+
+
+@lru_cache(maxsize=1)
+def _shared_genai_client() -> genai.Client:
+    """Process-wide Vertex client (Veo is on stable v1) with pooled keep-alive connections."""
+    return genai.Client(http_options=pooled_http_options(api_version="v1"))
+
+
+@lru_cache(maxsize=1)
+def _shared_storage_client() -> storage.Client:
+    """Process-wide GCS client whose connection pool is shared by all executor threads."""
+    client = storage.Client()
+    adapter = HTTPAdapter(pool_connections=GCS_POOL_CONNECTIONS, pool_maxsize=GCS_POOL_MAXSIZE)
+    client._http.mount("https://", adapter)
+    return client
 
 
 class VEOGenerationProvider(VideoGenerationProvider):
@@ -51,7 +90,9 @@ class VEOGenerationProvider(VideoGenerationProvider):
         location: str = "us-central1",
         model_name: str = "veo-3.0-fast-generate-001",
         credentials_path: Optional[str] = None,
-        gcs_bucket: Optional[str] = None
+        gcs_bucket: Optional[str] = None,
+        max_workers: int = 16,
+        cache_reference_images: bool = True
     ):
         """
         Initialize Veo video generation provider.
@@ -62,35 +103,93 @@ class VEOGenerationProvider(VideoGenerationProvider):
             model_name: Veo model to use (default: fast model)
             credentials_path: Path to service account JSON (uses ADC if not provided)
             gcs_bucket: Default GCS bucket for uploads (optional)
+            max_workers: Size of the dedicated thread pool for blocking SDK calls
+            cache_reference_images: Upload reference images to GCS once (by content
+                hash) and pass Veo the gs:// URI instead of inline bytes
         """
         self.project_id = project_id or os.getenv('GOOGLE_CLOUD_PROJECT')
         self.location = location
         self.model_name = model_name
         self.gcs_bucket = gcs_bucket or os.getenv('GCS_BUCKET_NAME', 'screenwrite-media')
         
-        # Initialize Vertex AI client using v1 API (Veo is on stable v1 now)
-        self.client = genai.Client(
-            http_options=types.HttpOptions(api_version="v1")
-        )
+        # Clients are shared across instances so TLS sessions and auth tokens are reused
+        self.client = _shared_genai_client()
+        self.storage_client = _shared_storage_client()
         
-        # Initialize GCS client for optional uploads
-        self.storage_client = storage.Client()
+        # Dedicated pool so Vertex/GCS calls don't queue behind other blocking work on the default executor
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="veo")
+        
+        self.cache_reference_images = cache_reference_images
+        # content hash -> types.Image pointing at the cached GCS object
+        self._reference_images = TTLCache(maxsize=REFERENCE_CACHE_MAXSIZE)
         
         logger.info(f"VEOGenerationProvider initialized: model={model_name}, project={self.project_id}, gcs_bucket={self.gcs_bucket}")
     
-    def _format_reference_image(self, reference_image: Image.Image) -> types.Image:
-        """Convert PIL Image to Google API Image format."""
+    async def aclose(self) -> None:
+        """Shut down the provider's thread pool, waiting for in-flight calls."""
+        await asyncio.to_thread(self._executor.shutdown, wait=True)
+    
+    async def _run_sync(self, func, *args, **kwargs):
+        """Run a blocking SDK operation on the provider's thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+    
+    def _format_reference_image_bytes(self, raw: bytes, mime_type: str) -> types.Image:
+        """Wrap already-encoded image bytes without going through PIL."""
+        return types.Image(image_bytes=raw, mime_type=mime_type)
+    
+    def _can_pass_through(self, reference_image: Image.Image, raw_bytes: Optional[bytes]) -> bool:
+        """Whether the original file bytes can be sent without re-encoding."""
+        return (
+            bool(raw_bytes)
+            and reference_image.format in REFERENCE_PASSTHROUGH_MIME_TYPES
+            and max(reference_image.size) <= REFERENCE_MAX_SIDE
+        )
+    
+    def _reference_mime_type(self, reference_image: Image.Image, raw_bytes: Optional[bytes]) -> str:
+        """MIME type the reference image will be sent as."""
+        if self._can_pass_through(reference_image, raw_bytes):
+            return REFERENCE_PASSTHROUGH_MIME_TYPES[reference_image.format]
+        return "image/jpeg"
+    
+    def _encode_reference_image(
+        self,
+        reference_image: Image.Image,
+        raw_bytes: Optional[bytes] = None
+    ) -> Tuple[bytes, str]:
+        """
+        Return (encoded bytes, mime type) for a reference image.
+        
+        Images larger than REFERENCE_MAX_SIDE are first downscaled (Lanczos).
+        When the original file bytes are supplied, already JPEG/PNG and within
+        that size they are used unchanged; otherwise the image is encoded as
+        JPEG, which is much faster to encode and several times smaller than PNG.
+        """
+        if self._can_pass_through(reference_image, raw_bytes):
+            return raw_bytes, REFERENCE_PASSTHROUGH_MIME_TYPES[reference_image.format]
+        
+        # JPEG has no alpha/palette modes (and palette images can't be Lanczos-resampled)
+        rgb_image = reference_image if reference_image.mode == "RGB" else reference_image.convert("RGB")
+        if max(rgb_image.size) > REFERENCE_MAX_SIDE:
+            # Same geometry as thumbnail(), without mutating the caller's image
+            scale = REFERENCE_MAX_SIDE / max(rgb_image.size)
+            size = (max(1, round(rgb_image.width * scale)), max(1, round(rgb_image.height * scale)))
+            rgb_image = rgb_image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        
+        img_buffer = io.BytesIO()
+        rgb_image.save(img_buffer, format='JPEG', quality=REFERENCE_JPEG_QUALITY, subsampling=0)
+        return img_buffer.getvalue(), "image/jpeg"
+    
+    def _format_reference_image(
+        self,
+        reference_image: Image.Image,
+        raw_bytes: Optional[bytes] = None
+    ) -> types.Image:
+        """Convert PIL Image to Google API Image format (inline bytes)."""
         try:
-            # Convert PIL Image to bytes
-            img_buffer = io.BytesIO()
-            reference_image.save(img_buffer, format='PNG')
-            img_bytes = img_buffer.getvalue()
+            encoded, mime_type = self._encode_reference_image(reference_image, raw_bytes)
+            formatted_image = self._format_reference_image_bytes(encoded, mime_type)
             
-            # Create Google API image object
-            formatted_image = types.Image(
-                image_bytes=img_bytes,
-                mime_type="image/png"
-            )
             logger.info("Successfully formatted reference image for Veo")
             return formatted_image
             
@@ -98,6 +197,46 @@ class VEOGenerationProvider(VideoGenerationProvider):
             logger.error(f"Failed to format reference image: {e}")
             raise ValueError(f"Could not format reference image: {e}")
     
+    def _reference_image_hash(self, reference_image: Image.Image, raw_bytes: Optional[bytes]) -> str:
+        """Content hash of a reference image (original bytes when available, else pixels)."""
+        digest = hashlib.sha256()
+        if raw_bytes:
+            digest.update(raw_bytes)
+        else:
+            digest.update(reference_image.tobytes())
+            digest.update(f"{reference_image.mode}|{reference_image.size}".encode())
+        return digest.hexdigest()
+    
+    def _cached_reference_image(
+        self,
+        reference_image: Image.Image,
+        raw_bytes: Optional[bytes] = None
+    ) -> types.Image:
+        """
+        Return a gs:// reference to the image, uploading it on first use.
+        
+        Images are stored once under REFERENCE_CACHE_PREFIX by content hash, so
+        repeat generations from the same image skip both the encode and the
+        inline upload; an in-process LRU of known hashes also skips the
+        exists() check.
+        """
+        image_hash = self._reference_image_hash(reference_image, raw_bytes)
+        cached = self._reference_images.get(image_hash)
+        if cached is not None:
+            return cached
+        
+        mime_type = self._reference_mime_type(reference_image, raw_bytes)
+        blob_name = f"{REFERENCE_CACHE_PREFIX}/{image_hash}.{REFERENCE_EXTENSIONS[mime_type]}"
+        blob = self.storage_client.bucket(self.gcs_bucket).blob(blob_name)
+        if not blob.exists():
+            encoded, mime_type = self._encode_reference_image(reference_image, raw_bytes)
+            blob.upload_from_string(encoded, content_type=mime_type)
+            logger.info(f"Cached reference image at gs://{self.gcs_bucket}/{blob_name}")
+        
+        formatted_image = types.Image(gcs_uri=f"gs://{self.gcs_bucket}/{blob_name}", mime_type=mime_type)
+        self._reference_images.set(image_hash, formatted_image)
+        return formatted_image
+    
     async def generate_video(
         self,
         prompt: str,
@@ -111,6 +250,8 @@ class VEOGenerationProvider(VideoGenerationProvider):
         user_id: Optional[str] = kwargs.get("user_id")
         session_id: Optional[str] = kwargs.get("session_id")
         custom_prefix: Optional[str] = kwargs.get("output_prefix")
+        # Original encoded bytes of reference_image, if the caller has them
+        reference_image_bytes: Optional[bytes] = kwargs.get("reference_image_bytes")
 
         if custom_prefix:
             staging_prefix = custom_prefix.strip("/")
@@ -134,8 +275,13 @@ class VEOGenerationProvider(VideoGenerationProvider):
 
                 # Format reference image if provided
                 formatted_image = None
-                if reference_image:
-                    formatted_image = self._format_reference_image(reference_image)
+                if reference_image and self.cache_reference_images:
+                    try:
+                        formatted_image = self._cached_reference_image(reference_image, reference_image_bytes)
+                    except Exception as e:
+                        logger.warning(f"Reference image cache unavailable, sending inline: {e}")
+                if reference_image and formatted_image is None:
+                    formatted_image = self._format_reference_image(reference_image, reference_image_bytes)
 
                 # Start video generation (async operation)
                 # aspect_ratio and resolution are direct parameters
@@ -168,7 +314,7 @@ class VEOGenerationProvider(VideoGenerationProvider):
                 logger.error(f"Video generation failed: {e}")
                 raise RuntimeError(f"Failed to start video generation: {e}")
 
-        return await async_wrap(_sync_generate)()
+        return await self._run_sync(_sync_generate)
     
     async def check_generation_status(
         self,
@@ -210,7 +356,49 @@ class VEOGenerationProvider(VideoGenerationProvider):
                 logger.error(f"Status check failed: {e}")
                 raise RuntimeError(f"Failed to check generation status: {e}")
         
-        return await async_wrap(_sync_check)()
+        return await self._run_sync(_sync_check)
+    
+    async def wait_until_done(
+        self,
+        operation: VideoGenerationOperation,
+        timeout: float = 600,
+        initial: float = 1.0,
+        max_interval: float = 15.0
+    ) -> VideoGenerationOperation:
+        """
+        Poll until the operation leaves "processing", backing off between checks.
+        
+        Intervals grow exponentially from `initial` up to `max_interval` with up
+        to 25% jitter, so a 30-60s generation costs a handful of RPCs instead of
+        one per fixed tick, and concurrent waiters don't poll in lockstep.
+        
+        Args:
+            operation: Operation returned by generate_video()
+            timeout: Max seconds to wait
+            initial: First polling interval in seconds
+            max_interval: Cap on the polling interval in seconds
+            
+        Returns:
+            The operation in its final state ("completed" or "failed")
+            
+        Raises:
+            TimeoutError: If the operation is still processing after `timeout`
+        """
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            operation = await self.check_generation_status(operation)
+            if operation.status != "processing":
+                return operation
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Video generation {operation.operation_id} did not finish within {timeout}s")
+            
+            interval = min(max_interval, initial * 2 ** attempt)
+            interval += random.uniform(0, 0.25 * interval)
+            await asyncio.sleep(min(interval, remaining))
+            attempt += 1
     
     async def download_generated_video(
         self,
@@ -218,6 +406,7 @@ class VEOGenerationProvider(VideoGenerationProvider):
         upload_to_gcs: bool = False,
         gcs_path: Optional[str] = None,
         gcs_bucket: Optional[str] = None,
+        include_bytes: bool = True,
         **kwargs
     ) -> GeneratedVideo:
         """
@@ -228,10 +417,16 @@ class VEOGenerationProvider(VideoGenerationProvider):
             upload_to_gcs: Whether to upload to GCS (default: False)
             gcs_path: Optional GCS path prefix (e.g., 'user_id/session_id')
             gcs_bucket: Optional GCS bucket (uses default if not provided)
+            include_bytes: Fetch the video contents; pass False when only the
+                GCS copy / signed URL is needed (GCS-hosted videos only)
             **kwargs: Additional parameters
             
+        When the video is already in GCS it is streamed into a spooled temp
+        file (exposed as GeneratedVideo.video_file) rather than read into
+        memory, and the optional GCS upload is a server-side rewrite.
+        
         Returns:
-            GeneratedVideo with video bytes and optional GCS URLs
+            GeneratedVideo with the video (bytes or spooled file) and optional GCS URLs
         """
         def _sync_download():
             try:
@@ -259,7 +454,9 @@ class VEOGenerationProvider(VideoGenerationProvider):
                 # The SDK wraps the response - access the video object
                 video_obj = generated_video.video if hasattr(generated_video, 'video') else generated_video
                 
-                video_data: bytes
+                video_data: Optional[bytes] = None
+                video_file = None
+                source_bucket = source_blob = None
                 # Prefer downloading from GCS URI if present
                 gcs_uri = getattr(video_obj, 'uri', None)
                 if gcs_uri:
@@ -269,27 +466,34 @@ class VEOGenerationProvider(VideoGenerationProvider):
                     parts = gcs_uri[5:].split('/', 1)  # Remove gs:// and split
                     source_bucket_name = parts[0]
                     source_blob_name = parts[1] if len(parts) > 1 else ''
-                    # Download from GCS
-                    logger.info(f"Downloading from GCS: {source_bucket_name}/{source_blob_name}")
                     source_bucket = self.storage_client.bucket(source_bucket_name)
                     source_blob = source_bucket.blob(source_blob_name)
-                    video_data = source_blob.download_as_bytes()
+                    # Size decides between a single stream and parallel ranged GETs
+                    source_blob.reload()
+                    file_size = source_blob.size or 0
+                    if include_bytes:
+                        # Download from GCS
+                        logger.info(f"Downloading from GCS: {source_bucket_name}/{source_blob_name} ({file_size} bytes)")
+                        if file_size >= PARALLEL_DOWNLOAD_MIN_SIZE:
+                            video_file = self._download_chunked(source_blob)
+                        else:
+                            video_file = tempfile.SpooledTemporaryFile(max_size=VIDEO_SPOOL_MAX_MEMORY)
+                            source_blob.download_to_file(video_file)
+                            file_size = video_file.tell()
                 else:
                     # Fallback: Use inline bytes if provided by SDK
                     video_bytes = getattr(video_obj, 'video_bytes', None)
                     if not video_bytes:
                         raise ValueError("No URI or inline video bytes present in generated video response")
                     video_data = video_bytes
-                file_size = len(video_data)
-                
-                logger.info(f"Video downloaded successfully: {file_size} bytes")
+                    file_size = len(video_data)
                 
                 # Get dimensions from metadata
                 resolution = operation.metadata.get("resolution", "720p")
                 width = 1280 if resolution == "720p" else 1920
                 height = 720 if resolution == "720p" else 1080
                 
-                logger.info(f"Video downloaded successfully: {file_size} bytes")
+                logger.info(f"Video ready: {file_size} bytes (contents fetched: {video_data is not None or video_file is not None})")
                 
                 # Create base result
                 result = GeneratedVideo(
@@ -300,50 +504,91 @@ class VEOGenerationProvider(VideoGenerationProvider):
                     height=height,
                     file_size=file_size,
                     format="mp4",
-                    metadata=operation.metadata or {}
+                    metadata=operation.metadata or {},
+                    video_file=video_file
                 )
                 
-                # Upload to GCS if requested
-                if upload_to_gcs:
-                    bucket_name = gcs_bucket or self.gcs_bucket
-                    
-                    # Generate unique filename
-                    asset_id = str(uuid.uuid4())
-                    file_name = f"generated_video_{asset_id}.mp4"
-                    
-                    if gcs_path:
-                        blob_name = f"{gcs_path}/{file_name}"
-                    else:
-                        blob_name = f"generated_videos/{file_name}"
-                    
-                    logger.info(f"Uploading to GCS: gs://{bucket_name}/{blob_name}")
-                    
-                    bucket = self.storage_client.bucket(bucket_name)
-                    blob = bucket.blob(blob_name)
-                    
-                    blob.upload_from_string(video_data, content_type="video/mp4")
-                    
-                    # Generate signed URL (7 days expiration)
-                    signed_url = blob.generate_signed_url(
+                return result, source_blob
+                
+            except Exception as e:
+                logger.error(f"Failed to download video: {e}")
+                raise RuntimeError(f"Failed to download generated video: {e}")
+        
+        result, source_blob = await self._run_sync(_sync_download)
+        
+        # Upload to GCS if requested
+        if upload_to_gcs:
+            bucket_name = gcs_bucket or self.gcs_bucket
+            
+            # Generate unique filename
+            asset_id = str(uuid.uuid4())
+            file_name = f"generated_video_{asset_id}.mp4"
+            
+            if gcs_path:
+                blob_name = f"{gcs_path}/{file_name}"
+            else:
+                blob_name = f"generated_videos/{file_name}"
+            
+            logger.info(f"Uploading to GCS: gs://{bucket_name}/{blob_name}")
+            
+            blob = self.storage_client.bucket(bucket_name).blob(blob_name)
+            
+            def _sync_upload():
+                if source_blob is not None:
+                    # Server-side rewrite: no bytes pass through this process.
+                    # Large or cross-location objects may take several calls.
+                    rewrite_token, _, _ = blob.rewrite(source_blob)
+                    while rewrite_token:
+                        rewrite_token, _, _ = blob.rewrite(source_blob, token=rewrite_token)
+                else:
+                    blob.upload_from_string(result.video_data, content_type="video/mp4")
+            
+            try:
+                # Signing only needs the object path, so it runs alongside the upload
+                _, signed_url = await asyncio.gather(
+                    self._run_sync(_sync_upload),
+                    self._run_sync(
+                        blob.generate_signed_url,
                         version="v4",
                         expiration=7 * 24 * 60 * 60,  # 7 days
                         method="GET"
                     )
-                    
-                    # Update metadata with GCS info
-                    result.metadata['gcs_uri'] = f"gs://{bucket_name}/{blob_name}"
-                    result.metadata['gcs_signed_url'] = signed_url
-                    result.metadata['gcs_public_url'] = blob.public_url
-                    
-                    logger.info(f"Upload complete: {signed_url[:80]}...")
-                
-                return result
-                
+                )
             except Exception as e:
-                logger.error(f"Failed to download video: {e}")
+                result.close()
+                logger.error(f"Failed to upload video: {e}")
                 raise RuntimeError(f"Failed to download generated video: {e}")
+            
+            # Update metadata with GCS info
+            result.metadata['gcs_uri'] = f"gs://{bucket_name}/{blob_name}"
+            result.metadata['gcs_signed_url'] = signed_url
+            result.metadata['gcs_public_url'] = blob.public_url
+            
+            logger.info(f"Upload complete: {signed_url[:80]}...")
         
-        return await async_wrap(_sync_download)()
+        return result
+    
+    def _download_chunked(self, source_blob: storage.Blob):
+        """
+        Download a large blob with concurrent ranged GETs into a temp file.
+        
+        Returns the open temp file (deleted when closed). Threads rather than
+        processes are used so the shared storage client needn't be pickled.
+        """
+        video_file = tempfile.NamedTemporaryFile(suffix=".mp4")
+        try:
+            transfer_manager.download_chunks_concurrently(
+                source_blob,
+                video_file.name,
+                chunk_size=PARALLEL_DOWNLOAD_CHUNK_SIZE,
+                max_workers=PARALLEL_DOWNLOAD_WORKERS,
+                worker_type=transfer_manager.THREAD,
+                deadline=PARALLEL_DOWNLOAD_DEADLINE
+            )
+        except Exception:
+            video_file.close()
+            raise
+        return video_file
     
     async def cancel_generation(
         self,
@@ -369,4 +614,4 @@ class VEOGenerationProvider(VideoGenerationProvider):
                 logger.error(f"Failed to cancel operation: {e}")
                 return False
         
-        return await async_wrap(_sync_cancel)()
+        return await self._run_sync(_sync_cancel)
@@ -0,0 +1,29 @@
+"""Shared HTTP transport settings for google-genai clients."""
+
+from typing import Optional
+
+import httpx
+from google.genai.types import HttpOptions
+
+# Keep-alive pool shared by every request a client makes
+GENAI_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, keepalive_expiry=300)
+# Generous per-request timeout (ms) for long thinking/generation calls
+GENAI_HTTP_TIMEOUT_MS = 600_000
+
+
+def pooled_http_options(api_version: Optional[str] = None) -> HttpOptions:
+    """
+    Build HttpOptions that reuse HTTP/2 keep-alive connections.
+    
+    Both the sync and async httpx clients inside genai.Client get explicit
+    pooled transports, so consecutive calls skip TCP/TLS setup.
+    
+    Args:
+        api_version: API version override (None keeps the SDK default)
+    """
+    return HttpOptions(
+        api_version=api_version,
+        timeout=GENAI_HTTP_TIMEOUT_MS,
+        client_args={"transport": httpx.HTTPTransport(http2=True, limits=GENAI_HTTP_LIMITS)},
+        async_client_args={"transport": httpx.AsyncHTTPTransport(http2=True, limits=GENAI_HTTP_LIMITS)}
+    )
@@ -1,15 +1,36 @@
 """OpenAI implementation of ChatProvider."""
 
-import json
+import asyncio
 import logging
 import os
+from functools import lru_cache
 from typing import List, Dict, Any, AsyncIterator, Optional
-from openai import AsyncOpenAI
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; count_tokens falls back to a char estimate
+    tiktoken = None
 
 from services.base.ChatProvider import ChatProvider, ChatMessage, ChatResponse
+from services.openai.openai_http import pooled_openai_client
+from utils.json_utils import JsonArrayItemStream, loads_json
 
 logger = logging.getLogger(__name__)
 
+# Chat format overhead documented by OpenAI: per message, plus reply priming
+TOKENS_PER_MESSAGE = 3
+TOKENS_REPLY_PRIMING = 3
+# Tokenize in a worker thread above this many messages to keep the loop free
+COUNT_TOKENS_THREAD_THRESHOLD = 64
+
+# Model-name prefixes of reasoning models (reasoning_effort instead of temperature)
+REASONING_MODEL_PREFIXES = ("o1", "o3", "o4")
+
+
+@lru_cache(maxsize=64)
+def _is_reasoning_model_name(model: str) -> bool:
+    return model.startswith(REASONING_MODEL_PREFIXES)
+
 
 class OpenAIChatProvider(ChatProvider):
     """OpenAI implementation using OpenAI API.
@@ -45,7 +66,9 @@ class OpenAIChatProvider(ChatProvider):
         self.default_max_tokens = default_max_tokens
         self.default_reasoning_effort = default_reasoning_effort
         
-        self.client = AsyncOpenAI(api_key=self.api_key)
+        self.client = pooled_openai_client(self.api_key)
+        # tiktoken encoders per model, built on first count_tokens call
+        self._encoders: Dict[str, Any] = {}
         logger.info(f"Initialized OpenAI client with model: {default_model_name}")
     
     def _convert_messages(self, messages: List[ChatMessage]) -> List[Dict[str, str]]:
@@ -58,19 +81,11 @@ class OpenAIChatProvider(ChatProvider):
         Returns:
             List of OpenAI message dicts
         """
-        openai_messages = []
-        
-        for msg in messages:
-            openai_messages.append({
-                "role": msg.role,
-                "content": msg.content
-            })
-        
-        return openai_messages
+        return [{"role": msg.role, "content": msg.content} for msg in messages]
     
     def _is_reasoning_model(self, model: str) -> bool:
-        """Check if model is a reasoning model (o1, o3, etc.)."""
-        return model.startswith("o1") or model.startswith("o3")
+        """Check if model is a reasoning model (o1, o3, o4, etc.)."""
+        return _is_reasoning_model_name(model)
     
     async def generate_chat_response(
         self,
@@ -85,27 +100,12 @@ class OpenAIChatProvider(ChatProvider):
         if not messages:
             raise ValueError("Messages cannot be empty")
         
-        openai_messages = self._convert_messages(messages)
-        model = model_name or self.default_model_name
-        max_tok = max_tokens or self.default_max_tokens
-        
-        # Build request parameters
         request_params = {
-            "model": model,
-            "messages": openai_messages,
-            "max_tokens": max_tok,
+            **self._chat_fixed_params(model_name, temperature, max_tokens, reasoning_effort),
+            "messages": self._convert_messages(messages),
             **kwargs
         }
         
-        # Reasoning models (o1, o3) don't support temperature
-        # They use reasoning_effort instead
-        if self._is_reasoning_model(model):
-            effort = reasoning_effort or self.default_reasoning_effort
-            request_params["reasoning_effort"] = effort
-        else:
-            temp = temperature if temperature is not None else self.default_temperature
-            request_params["temperature"] = temp
-        
         response = await self.client.chat.completions.create(**request_params)
         
         # Extract content
@@ -135,6 +135,27 @@ class OpenAIChatProvider(ChatProvider):
             }
         )
     
+    def _chat_fixed_params(
+        self,
+        model_name: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+        reasoning_effort: Optional[str]
+    ) -> Dict[str, Any]:
+        """Return the message-independent request params as a fresh dict."""
+        model = model_name or self.default_model_name
+        params = {
+            "model": model,
+            "max_tokens": max_tokens or self.default_max_tokens
+        }
+        # Reasoning models (o1, o3, o4) don't support temperature
+        # They use reasoning_effort instead
+        if self._is_reasoning_model(model):
+            params["reasoning_effort"] = reasoning_effort or self.default_reasoning_effort
+        else:
+            params["temperature"] = temperature if temperature is not None else self.default_temperature
+        return params
+    
     async def stream_chat_response(
         self,
         messages: List[ChatMessage],
@@ -181,6 +202,55 @@ class OpenAIChatProvider(ChatProvider):
         
         OpenAI supports native structured outputs via response_format with json_schema.
         """
+        request_params = self._schema_request_params(
+            messages, response_schema, model_name, temperature, reasoning_effort, **kwargs
+        )
+        response = await self.client.chat.completions.create(**request_params)
+        
+        # Parse JSON response
+        content_text = response.choices[0].message.content or "{}"
+        return loads_json(content_text)
+    
+    async def stream_chat_response_with_schema(
+        self,
+        messages: List[ChatMessage],
+        response_schema: Dict[str, Any],
+        array_field: str = "items",
+        model_name: Optional[str] = None,
+        temperature: Optional[float] = None,
+        reasoning_effort: Optional[str] = None,
+        **kwargs
+    ) -> AsyncIterator[Any]:
+        """
+        Stream a structured response, yielding elements of one array as they complete.
+        
+        The response is generated with stream=True under the same strict JSON
+        schema; each element of the top-level `array_field` array is parsed and
+        yielded as soon as its closing token arrives, instead of after the
+        whole document.
+        """
+        request_params = self._schema_request_params(
+            messages, response_schema, model_name, temperature, reasoning_effort, **kwargs
+        )
+        request_params["stream"] = True
+        
+        parser = JsonArrayItemStream(array_field)
+        stream = await self.client.chat.completions.create(**request_params)
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                for item in parser.feed(chunk.choices[0].delta.content):
+                    yield item
+    
+    def _schema_request_params(
+        self,
+        messages: List[ChatMessage],
+        response_schema: Dict[str, Any],
+        model_name: Optional[str],
+        temperature: Optional[float],
+        reasoning_effort: Optional[str],
+        **kwargs
+    ) -> Dict[str, Any]:
+        """Build chat.completions params for a strict json_schema response."""
         if not messages or not response_schema:
             raise ValueError("Messages and schema required")
         
@@ -204,7 +274,7 @@ class OpenAIChatProvider(ChatProvider):
             **kwargs
         }
         
-        # Reasoning models (o1, o3) handle parameters differently
+        # Reasoning models (o1, o3, o4) handle parameters differently
         if self._is_reasoning_model(model):
             effort = reasoning_effort or self.default_reasoning_effort
             request_params["reasoning_effort"] = effort
@@ -212,11 +282,7 @@ class OpenAIChatProvider(ChatProvider):
             temp = temperature if temperature is not None else self.default_temperature
             request_params["temperature"] = temp
         
-        response = await self.client.chat.completions.create(**request_params)
-        
-        # Parse JSON response
-        content_text = response.choices[0].message.content or "{}"
-        return json.loads(content_text)
+        return request_params
     
     async def count_tokens(
         self,
@@ -227,13 +293,31 @@ class OpenAIChatProvider(ChatProvider):
         """
         Count tokens in messages.
         
-        OpenAI doesn't provide a direct token counting API in the SDK.
-        We use a rough estimate: ~4 characters per token (similar to GPT tokenization).
-        For production, consider using tiktoken library.
+        Uses the model's tiktoken BPE encoding (cl100k_base for unknown models)
+        plus OpenAI's documented per-message chat overhead. Without tiktoken
+        installed, falls back to a rough ~4 characters per token estimate.
         """
         if not messages:
             raise ValueError("Messages cannot be empty")
         
-        # Rough estimate: count characters and divide by 4
-        total_chars = sum(len(msg.content) for msg in messages)
-        return total_chars // 4
+        if tiktoken is None:
+            total_chars = sum(len(msg.content) for msg in messages)
+            return total_chars // 4
+        
+        model = model_name or self.default_model_name
+        if len(messages) > COUNT_TOKENS_THREAD_THRESHOLD:
+            return await asyncio.to_thread(self._count_tokens_sync, messages, model)
+        return self._count_tokens_sync(messages, model)
+    
+    def _count_tokens_sync(self, messages: List[ChatMessage], model: str) -> int:
+        encoder = self._encoders.get(model)
+        if encoder is None:
+            try:
+                encoder = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoder = tiktoken.get_encoding("cl100k_base")
+            self._encoders[model] = encoder
+        
+        encoded = encoder.encode_ordinary_batch([msg.content for msg in messages])
+        content_tokens = sum(len(tokens) for tokens in encoded)
+        return content_tokens + TOKENS_PER_MESSAGE * len(messages) + TOKENS_REPLY_PRIMING
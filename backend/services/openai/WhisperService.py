@@ -4,19 +4,33 @@ OpenAI Whisper API service for audio transcription with word-level timestamps.
 Provides high-precision word-level timestamps for generated voiceovers.
 """
 
+import asyncio
+import itertools
 import logging
 import os
-import io
-from typing import List, Optional, Tuple
-from openai import AsyncOpenAI
+import re
+import mimetypes
+from typing import List, Optional, Tuple, Union
 import numpy as np
 from pydub import AudioSegment
-from pydub.silence import detect_silence
 
 from services.base.VoiceGenerationProvider import WhisperTimestamp
+from services.openai.openai_http import pooled_openai_client
 
 logger = logging.getLogger(__name__)
 
+# Sentence boundary: terminal punctuation (captured) followed by whitespace
+_SENTENCE_SPLIT_RE = re.compile(r'([.!?])\s+')
+
+# Default in-flight transcriptions for transcribe_many
+TRANSCRIBE_MAX_CONCURRENCY = 8
+
+# Silence analysis decodes to 16-bit mono PCM at this rate
+ANALYSIS_SAMPLE_RATE = 44100
+
+# numpy dtype for AudioSegment.raw_data by sample width (pydub stores signed PCM)
+_PCM_DTYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
 
 class WhisperService:
     """
@@ -36,7 +50,8 @@ class WhisperService:
         if not self.api_key:
             raise ValueError("OPENAI_API_KEY environment variable is required")
         
-        self.client = AsyncOpenAI(api_key=self.api_key)
+        # Shared keep-alive pool with SDK-level retries on 429/5xx
+        self.client = pooled_openai_client(self.api_key)
         logger.info("Initialized Whisper service with OpenAI API")
     
     async def transcribe_with_timestamps(
@@ -62,18 +77,23 @@ class WhisperService:
         try:
             logger.info(f"Transcribing {len(audio_bytes)} bytes of {audio_format} audio")
             
-            # Create file-like object for API
-            audio_file = io.BytesIO(audio_bytes)
-            audio_file.name = f"audio.{audio_format}"
+            # (filename, content, mime) tuple: the SDK puts the bytes straight into
+            # the multipart body instead of read()-copying them out of a file object
+            filename = f"audio.{audio_format}"
+            audio_file = (filename, audio_bytes, mimetypes.guess_type(filename)[0] or "application/octet-stream")
             
             # Call Whisper API with word-level timestamps
-            # Using verbose_json response_format to get word-level timestamps
-            transcription = await self.client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                response_format="verbose_json",
-                timestamp_granularities=["word"],
-                language=language
+            # Using verbose_json response_format to get word-level timestamps.
+            # The local decode needed for silence refinement runs meanwhile.
+            transcription, audio = await asyncio.gather(
+                self.client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=audio_file,
+                    response_format="verbose_json",
+                    timestamp_granularities=["word"],
+                    language=language
+                ),
+                self._decode_audio(audio_bytes, audio_format)
             )
             
             # Extract word-level timestamps
@@ -93,14 +113,16 @@ class WhisperService:
                 
                 # Refine timestamps by snapping to silence gaps (for clean narration)
                 # Higher min_silence_duration filters out mid-word pauses
-                word_timestamps = self._refine_with_silence_detection(
-                    word_timestamps, 
-                    audio_bytes, 
-                    audio_format,
-                    silence_thresh_db=-60,
-                    min_silence_duration_ms=150,
-                    snap_window_ms=500
-                )
+                # CPU-bound numpy sweep: keep it off the event loop
+                if audio is not None:
+                    word_timestamps = await asyncio.to_thread(
+                        self._refine_with_silence_detection,
+                        word_timestamps,
+                        audio,
+                        silence_thresh_db=-60,
+                        min_silence_duration_ms=150,
+                        snap_window_ms=500
+                    )
             else:
                 logger.warning("No word-level timestamps returned from Whisper")
             
@@ -110,14 +132,51 @@ class WhisperService:
             logger.error(f"Whisper transcription failed: {str(e)}", exc_info=True)
             raise RuntimeError(f"Failed to transcribe audio: {str(e)}")
     
+    async def transcribe_many(
+        self,
+        clips: List[Union[Tuple[bytes, str], Tuple[bytes, str, Optional[str]]]],
+        language: Optional[str] = None,
+        max_concurrency: int = TRANSCRIBE_MAX_CONCURRENCY
+    ) -> List[Union[List[WhisperTimestamp], Exception]]:
+        """
+        Transcribe several clips concurrently.
+        
+        Wall-clock time is roughly the slowest clip rather than the sum of all.
+        Each clip is decoded and refined independently alongside its own request.
+        
+        Args:
+            clips: (audio_bytes, audio_format) pairs, or (audio_bytes, audio_format,
+                language) triples to override the language per clip
+            language: Optional language code for clips that don't specify one
+            max_concurrency: Max transcriptions in flight
+            
+        Returns:
+            Per clip, in order: its timestamps, or the exception it failed with
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def _transcribe(
+            audio_bytes: bytes,
+            audio_format: str,
+            clip_language: Optional[str] = None
+        ) -> List[WhisperTimestamp]:
+            async with semaphore:
+                return await self.transcribe_with_timestamps(
+                    audio_bytes, audio_format, clip_language or language
+                )
+        
+        return await asyncio.gather(
+            *(_transcribe(*clip) for clip in clips),
+            return_exceptions=True
+        )
+    
     def _group_into_sentences(self, word_timestamps: List[WhisperTimestamp], full_text: str) -> List[WhisperTimestamp]:
         """Group word-level timestamps into sentences based on punctuation in full text."""
         if not word_timestamps or not full_text:
             return word_timestamps
         
         # Split full text into sentences
-        import re
-        sentences_text = re.split(r'([.!?])\s+', full_text)
+        sentences_text = _SENTENCE_SPLIT_RE.split(full_text)
         
         # Reconstruct sentences with their punctuation
         sentences = []
@@ -128,36 +187,52 @@ class WhisperService:
         if len(sentences_text) % 2 == 1 and sentences_text[-1].strip():
             sentences.append(sentences_text[-1])
         
-        # Map words to sentences
-        result = []
-        word_idx = 0
+        # Map words to sentences: sentence i owns words offsets[i]:offsets[i+1]
+        # (word counts are approximate; sentences past the last word get none)
+        stripped = [sentence_text.strip() for sentence_text in sentences]
+        offsets = list(itertools.accumulate((len(text.split()) for text in stripped), initial=0))
         
-        for sentence_text in sentences:
-            # Count words in this sentence (approximate)
-            sentence_words = sentence_text.strip().split()
-            sentence_word_count = len(sentence_words)
-            
-            # Collect timestamps for this sentence
-            sentence_timestamps = []
-            for _ in range(min(sentence_word_count, len(word_timestamps) - word_idx)):
-                if word_idx < len(word_timestamps):
-                    sentence_timestamps.append(word_timestamps[word_idx])
-                    word_idx += 1
-            
+        result = []
+        for i, sentence_text in enumerate(stripped):
+            sentence_timestamps = word_timestamps[offsets[i]:offsets[i + 1]]
             if sentence_timestamps:
                 result.append(WhisperTimestamp(
-                    word=sentence_text.strip(),
+                    word=sentence_text,
                     start=sentence_timestamps[0].start,
                     end=sentence_timestamps[-1].end
                 ))
         
         return result
     
+    async def _decode_audio(self, audio_bytes: bytes, audio_format: str) -> Optional[AudioSegment]:
+        """
+        Decode audio for silence analysis; None (with a warning) if it can't be decoded.
+        
+        Pipes the bytes through ffmpeg straight to raw 16-bit mono PCM, skipping
+        pydub's temp files and WAV round-trip; the PCM backs the AudioSegment as-is.
+        """
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                AudioSegment.converter,
+                '-loglevel', 'error',
+                '-i', 'pipe:0',
+                '-f', 's16le', '-ac', '1', '-ar', str(ANALYSIS_SAMPLE_RATE), 'pipe:1',
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            pcm, stderr = await proc.communicate(audio_bytes)
+            if proc.returncode != 0:
+                raise RuntimeError(stderr.decode(errors='replace').strip() or f"ffmpeg exited with {proc.returncode}")
+            return AudioSegment(data=pcm, sample_width=2, frame_rate=ANALYSIS_SAMPLE_RATE, channels=1)
+        except Exception as e:
+            logger.warning(f"Audio decode failed, silence refinement skipped: {str(e)}")
+            return None
+    
     def _refine_with_silence_detection(
         self,
         timestamps: List[WhisperTimestamp],
-        audio_bytes: bytes,
-        audio_format: str,
+        audio: AudioSegment,
         silence_thresh_db: int = -40,
         min_silence_duration_ms: int = 50,
         snap_window_ms: int = 150
@@ -170,8 +245,7 @@ class WhisperService:
         
         Args:
             timestamps: Original timestamps from Whisper
-            audio_bytes: Raw audio data
-            audio_format: Audio format (mp3, wav, etc.)
+            audio: Decoded audio (see _decode_audio)
             silence_thresh_db: Silence threshold in dB (default: -40dB)
             min_silence_duration_ms: Minimum silence duration to consider (default: 50ms)
             snap_window_ms: Maximum distance to snap timestamps (default: 150ms)
@@ -180,16 +254,13 @@ class WhisperService:
             Refined timestamps snapped to silence gaps
         """
         try:
-            # Load audio
-            audio = AudioSegment.from_file(io.BytesIO(audio_bytes), format=audio_format)
-            
             logger.info(f"Detecting silence gaps (thresh={silence_thresh_db}dB, min_duration={min_silence_duration_ms}ms)")
             
             # Detect all silence spans
-            silence_ranges = detect_silence(
+            silence_ranges = self._detect_silence(
                 audio,
-                min_silence_len=min_silence_duration_ms,
-                silence_thresh=silence_thresh_db
+                min_silence_len_ms=min_silence_duration_ms,
+                silence_thresh_db=silence_thresh_db
             )
             
             # Convert to seconds and filter by duration threshold
@@ -208,22 +279,20 @@ class WhisperService:
                 logger.warning("No silence gaps detected, using original timestamps")
                 return timestamps
             
-            # Refine each timestamp by snapping to nearest silence
-            refined = []
-            snap_window_s = snap_window_ms / 1000.0
+            # Snap all boundaries at once: starts to the end of their closest gap,
+            # ends to the start of theirs
+            gap_starts = np.fromiter((gap_start for gap_start, _ in silence_gaps), dtype=np.float64, count=len(silence_gaps))
+            gap_ends = np.fromiter((gap_end for _, gap_end in silence_gaps), dtype=np.float64, count=len(silence_gaps))
+            starts = np.fromiter((ts.start for ts in timestamps), dtype=np.float64, count=len(timestamps))
+            ends = np.fromiter((ts.end for ts in timestamps), dtype=np.float64, count=len(timestamps))
             
-            for i, ts in enumerate(timestamps):
-                gap_for_start, dist_start = self._find_closest_gap(ts.start, silence_gaps)
-                gap_for_end, dist_end = self._find_closest_gap(ts.end, silence_gaps)
-                
-                new_start = gap_for_start[1] if gap_for_start else ts.start
-                new_end = gap_for_end[0] if gap_for_end else ts.end
-                
-                refined.append(WhisperTimestamp(
-                    word=ts.word,
-                    start=new_start,
-                    end=new_end
-                ))
+            new_starts = gap_ends[self._closest_gaps(starts, gap_starts, gap_ends)].tolist()
+            new_ends = gap_starts[self._closest_gaps(ends, gap_starts, gap_ends)].tolist()
+            
+            refined = [
+                WhisperTimestamp(word=ts.word, start=new_start, end=new_end)
+                for ts, new_start, new_end in zip(timestamps, new_starts, new_ends)
+            ]
             
             return refined
             
@@ -231,19 +300,75 @@ class WhisperService:
             logger.warning(f"Silence detection failed, using original timestamps: {str(e)}")
             return timestamps
     
-    def _find_closest_gap(
+    def _detect_silence(
         self,
-        time: float,
-        silence_gaps: List[Tuple[float, float]]
-    ) -> Tuple[Optional[Tuple[float, float]], float]:
-        """Return the closest silence gap and its distance to the timestamp."""
-        closest_gap = None
-        best_dist = float('inf')
-
-        for gap_start, gap_end in silence_gaps:
-            dist = min(abs(time - gap_start), abs(time - gap_end))
-            if dist < best_dist:
-                best_dist = dist
-                closest_gap = (gap_start, gap_end)
-
-        return closest_gap, best_dist
+        audio: AudioSegment,
+        min_silence_len_ms: int,
+        silence_thresh_db: float
+    ) -> List[Tuple[int, int]]:
+        """
+        Find silent spans, matching pydub.silence.detect_silence (1ms seek step).
+        
+        Every min_silence_len_ms window starting on a millisecond boundary whose
+        RMS is below silence_thresh_db (dBFS) is silent; overlapping silent
+        windows merge into one span. Window power comes from a single cumulative
+        sum over the samples instead of one AudioSegment slice per millisecond.
+        
+        Returns:
+            [start_ms, end_ms] spans in time order
+        """
+        duration_ms = len(audio)
+        if duration_ms < min_silence_len_ms:
+            return []
+        
+        # Reduce to one mono power value per frame up front (channel-averaged, so window
+        # means still equal RMS² over interleaved samples); indexes frames, not samples,
+        # and avoids a float copy of the interleaved stereo data
+        samples = np.frombuffer(audio.raw_data, dtype=_PCM_DTYPES[audio.sample_width]).reshape(-1, audio.channels)
+        power = np.einsum('ij,ij->i', samples, samples, dtype=np.float64)
+        if audio.channels > 1:
+            power /= audio.channels
+        cumulative = np.concatenate(([0.0], np.cumsum(power)))
+        
+        # Frame index of every millisecond boundary
+        boundaries = np.minimum(
+            np.arange(duration_ms + 1, dtype=np.int64) * audio.frame_rate // 1000,
+            len(power)
+        )
+        window_starts = boundaries[:duration_ms - min_silence_len_ms + 1]
+        window_ends = boundaries[min_silence_len_ms:]
+        window_frames = np.maximum(window_ends - window_starts, 1)
+        mean_power = (cumulative[window_ends] - cumulative[window_starts]) / window_frames
+        
+        # pydub compares audioop's integer (truncated) RMS against the threshold
+        threshold = (10 ** (silence_thresh_db / 20.0)) * audio.max_possible_amplitude
+        silent_starts = np.flatnonzero(np.floor(np.sqrt(mean_power)) < threshold)
+        if len(silent_starts) == 0:
+            return []
+        
+        # Start a new span wherever the next silent window doesn't overlap the previous one
+        steps = np.diff(silent_starts)
+        breaks = np.flatnonzero((steps != 1) & (steps > min_silence_len_ms))
+        span_starts = silent_starts[np.concatenate(([0], breaks + 1))]
+        span_ends = silent_starts[np.concatenate((breaks, [len(silent_starts) - 1]))] + min_silence_len_ms
+        return list(zip(span_starts.tolist(), span_ends.tolist()))
+    
+    def _closest_gaps(
+        self,
+        times: np.ndarray,
+        gap_starts: np.ndarray,
+        gap_ends: np.ndarray
+    ) -> np.ndarray:
+        """
+        Return, for each time, the index of the silence gap with the nearest edge.
+        
+        Gaps must be sorted and non-overlapping, so only the gaps either side of
+        a time can be closest; ties go to the earlier gap.
+        """
+        right = np.searchsorted(gap_starts, times, side='left')
+        left = np.maximum(right - 1, 0)
+        right = np.minimum(right, len(gap_starts) - 1)
+        
+        dist_left = np.minimum(np.abs(times - gap_starts[left]), np.abs(times - gap_ends[left]))
+        dist_right = np.minimum(np.abs(times - gap_starts[right]), np.abs(times - gap_ends[right]))
+        return np.where(dist_left <= dist_right, left, right)
@@ -0,0 +1,33 @@
+"""Shared HTTP client settings for OpenAI SDK clients."""
+
+from functools import lru_cache
+
+import httpx
+from openai import AsyncOpenAI
+
+# One keep-alive pool shared by every OpenAI client in the process
+OPENAI_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+# Long read timeout for long generations and audio uploads; fail fast on connect
+OPENAI_HTTP_TIMEOUT = httpx.Timeout(600.0, connect=5.0)
+# SDK retries 429/5xx/connection errors with jittered exponential backoff (honours Retry-After)
+OPENAI_MAX_RETRIES = 5
+
+
+@lru_cache(maxsize=1)
+def shared_openai_http_client() -> httpx.AsyncClient:
+    """Process-wide HTTP/2 client so chat and Whisper calls share connections."""
+    return httpx.AsyncClient(http2=True, limits=OPENAI_HTTP_LIMITS, timeout=OPENAI_HTTP_TIMEOUT)
+
+
+def pooled_openai_client(api_key: str) -> AsyncOpenAI:
+    """
+    Build an AsyncOpenAI client on the shared HTTP pool.
+    
+    Args:
+        api_key: OpenAI API key
+    """
+    return AsyncOpenAI(
+        api_key=api_key,
+        http_client=shared_openai_http_client(),
+        max_retries=OPENAI_MAX_RETRIES
+    )
@@ -0,0 +1,108 @@
+"""Fast JSON parsing helpers for LLM structured output."""
+
+import json
+from typing import Any, List, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib parser
+    orjson = None
+
+
+def loads_json(text: str) -> Any:
+    """
+    Parse a JSON document, using orjson when installed.
+    
+    Args:
+        text: JSON text
+        
+    Returns:
+        Parsed Python object
+        
+    Raises:
+        json.JSONDecodeError: If text is not valid JSON (orjson's error subclasses it)
+    """
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+class JsonArrayItemStream:
+    """
+    Incrementally extract the elements of one array from a streamed JSON object.
+    
+    Feed text chunks as they arrive; each call returns the elements of the
+    array under the top-level key `field` that were completed by that chunk.
+    Every character is scanned once and consumed text is dropped, so cost is
+    linear in the document and memory is bounded by the largest element.
+    """
+    
+    def __init__(self, field: str):
+        """
+        Args:
+            field: Top-level key whose array elements should be yielded
+        """
+        self.field = field
+        self._text = ""
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._in_array = False
+        self._item_start: Optional[int] = None
+    
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume the next chunk and return the array elements it completed."""
+        start = len(self._text)
+        text = self._text + chunk
+        items = []
+        
+        for i in range(start, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start + 1:i]
+                continue
+            
+            # Direct children of the target array
+            if self._in_array and self._depth == 2:
+                if ch == "," or ch == "]":
+                    if self._item_start is not None:
+                        items.append(loads_json(text[self._item_start:i]))
+                        self._item_start = None
+                    if ch == "]":
+                        self._in_array = False
+                        self._depth -= 1
+                    continue
+                if self._item_start is None and not ch.isspace():
+                    self._item_start = i
+            
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == "{" or ch == "[":
+                if ch == "[" and self._depth == 1 and self._last_key == self.field:
+                    self._in_array = True
+                self._depth += 1
+            elif ch == "}" or ch == "]":
+                self._depth -= 1
+        
+        # Keep only the element (or key string) still in progress
+        keep_from = len(text)
+        if self._item_start is not None:
+            keep_from = self._item_start
+        if self._in_string:
+            keep_from = min(keep_from, self._string_start)
+        self._text = text[keep_from:]
+        if self._item_start is not None:
+            self._item_start -= keep_from
+        self._string_start -= keep_from
+        
+        return items
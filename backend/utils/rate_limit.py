@@ -0,0 +1,42 @@
+"""Async rate limiting utilities."""
+
+import asyncio
+import time
+
+
+class RateLimiter:
+    """
+    Token bucket limiting calls to `rate` per `period` seconds.
+    
+    Tokens refill continuously from elapsed time, so no background task is
+    needed; up to `rate` calls may burst when the bucket is full.
+    """
+    
+    def __init__(self, rate: int, period: float = 60.0):
+        """
+        Args:
+            rate: Calls allowed per period (bucket capacity)
+            period: Window length in seconds
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.period)
+        self._updated = now
+    
+    async def acquire(self) -> None:
+        """Wait until a token is available, then consume it."""
+        # Waiters queue on the lock, so tokens are granted in arrival order
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) * self.period / self.rate)
+                self._refill()
+            self._tokens -= 1
@@ -0,0 +1,68 @@
+"""Embedding-similarity cache for LLM responses."""
+
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Cache that matches near-duplicate queries by embedding cosine similarity.
+    
+    Entries are grouped by namespace (e.g. model + settings + prior history),
+    so only the query text itself is compared semantically.
+    """
+    
+    def __init__(
+        self,
+        embed_fn: Callable[[str], Sequence[float]],
+        threshold: float = 0.95,
+        ttl_seconds: float = 3600,
+        max_entries_per_namespace: int = 256
+    ):
+        """
+        Args:
+            embed_fn: Sync function returning an embedding vector for a text
+            threshold: Min cosine similarity counted as a hit
+            ttl_seconds: How long an entry stays valid
+            max_entries_per_namespace: Oldest entries are dropped beyond this
+        """
+        self._embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_namespace = max_entries_per_namespace
+        # namespace -> [(unit vector, value, expires_at)]
+        self._entries: Dict[str, List[Tuple[np.ndarray, Any, float]]] = {}
+        self._lock = threading.Lock()
+    
+    async def embed(self, text: str) -> np.ndarray:
+        """Embed text off the event loop and L2-normalize it."""
+        vector = np.asarray(await asyncio.to_thread(self._embed_fn, text), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) + 1e-12)
+    
+    def lookup(self, namespace: str, vector: np.ndarray) -> Optional[Any]:
+        """Return the best cached value above the similarity threshold, if any."""
+        now = time.monotonic()
+        with self._lock:
+            entries = [entry for entry in self._entries.get(namespace, []) if entry[2] > now]
+            if not entries:
+                self._entries.pop(namespace, None)
+                return None
+            self._entries[namespace] = entries
+            
+            scores = np.stack([entry[0] for entry in entries]) @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                return entries[best][1]
+            return None
+    
+    def store(self, namespace: str, vector: np.ndarray, value: Any) -> None:
+        """Add a value for the given query vector."""
+        with self._lock:
+            entries = self._entries.setdefault(namespace, [])
+            entries.append((vector, value, time.monotonic() + self.ttl_seconds))
+            if len(entries) > self.max_entries_per_namespace:
+                del entries[:len(entries) - self.max_entries_per_namespace]